@@ -1,10 +1,65 @@
-from flask import Flask, render_template_string, jsonify, send_file, send_from_directory
-from data_engine import MacroEngine
+from flask import Flask, Response, g, render_template_string, jsonify, request, send_file, send_from_directory
+from data_engine import FIELD_SECTIONS, SECTION_DEPENDENCIES, MacroEngine, parse_fields
+from payload import PayloadCache, choose_encoding, compact_payload, filter_since, select_fields
+from stream import SnapshotBroadcaster
+from snapshot_store import SharedSnapshot
+from snapshot_archive import RANGE_LIMIT, SnapshotArchive
+from metrics import REGISTRY, REQUEST_SECONDS, RequestProfiler
 import json
 import os
+import time
+from datetime import datetime
 
 app = Flask(__name__)
 engine = MacroEngine()
+payloads = PayloadCache()
+# One computation per refresh, fanned out to every /api/macro/stream client
+broadcaster = SnapshotBroadcaster()
+
+# Where requests read snapshots from. Under multiple workers (see gunicorn.conf.py) one elected
+# worker runs the engine and every worker serves the file it publishes.
+if os.getenv('MACRO_SHARED_SNAPSHOT'):
+    snapshots = SharedSnapshot(os.getenv('MACRO_SHARED_SNAPSHOT'), ttl=engine._cache_ttl)
+    snapshots.start(engine, listener=broadcaster.publish)
+else:
+    snapshots = engine
+    engine.subscribe(broadcaster.publish)
+    engine.subscribe_quotes(broadcaster.publish_patch)
+
+def is_producer():
+    """Whether this process runs the engine (always, unless snapshots come from a shared file)."""
+    return getattr(snapshots, 'is_producer', True)
+
+# Every full refresh this process computes (not quote ticks) is archived for ?asof= and /api/macro/archive
+archive = SnapshotArchive()
+engine.subscribe(archive.append)
+# Cold start: serve the last archived snapshot at once while the first refresh runs
+_latest = archive.latest()
+if _latest:
+    engine.prime(*_latest)
+
+REGISTRY.gauge('macro_snapshot_age_seconds', 'Age of the snapshot held by this process\'s engine.',
+               engine.snapshot_age)
+REGISTRY.gauge('macro_stream_subscribers', 'Connected /api/macro/stream clients.',
+               lambda: broadcaster.subscribers)
+
+# Set MACRO_PROFILING=1 to allow `?profile=1` on any route, which returns a profile instead of the body
+PROFILING = os.getenv('MACRO_PROFILING') == '1'
+
+@app.before_request
+def start_request_timer():
+    g.started = time.perf_counter()
+    if PROFILING and request.args.get('profile'):
+        g.profiler = RequestProfiler()
+        g.profiler.start()
+
+@app.after_request
+def record_request(response):
+    REQUEST_SECONDS.observe(time.perf_counter() - g.started,
+                            endpoint=request.endpoint or 'unknown', status=response.status_code)
+    if g.get('profiler') is not None:
+        return Response(g.profiler.stop(), mimetype='text/plain')
+    return response
 
 @app.route('/')
 def home():
@@ -16,13 +71,151 @@ def serve_static(filename):
 
 @app.route('/api/macro')
 def get_macro_data():
+    """Latest snapshot. `format=compact` returns columnar float32 blocks (pre-encoded and
+    compressed once per snapshot); `since=YYYY-MM-DD` trims the momentum history to newer points.
+    `fields=composite,components` (see FIELD_SECTIONS; `raw` for all raw blocks) returns only those
+    fields as JSON, computing only the sections they need. `asof=YYYY-MM-DD` (or an ISO timestamp)
+    serves the last archived snapshot computed by then, with no upstream fetch. Every form carries
+    an ETag and answers If-None-Match with 304 while its data is unchanged."""
+    try:
+        fields = parse_fields(request.args['fields']) if 'fields' in request.args else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return snapshot_response(fields)
+
+@app.route('/api/macro/sections/<name>')
+def get_macro_section(name):
+    """One section (macro, market, sentiment, scores, summaries) as the snapshot fields it backs."""
+    if name not in SECTION_DEPENDENCIES:
+        return jsonify({"error": f"Unknown section '{name}'. Valid sections: {', '.join(SECTION_DEPENDENCIES)}"}), 404
+    return snapshot_response([f for f, section in FIELD_SECTIONS.items() if section == name])
+
+def archived_snapshot(asof, fields=None):
+    """(result, meta) of the archived snapshot as of `asof`, shaped like a live one."""
+    found = archive.asof(asof)  # ValueError on anything but a date or ISO timestamp
+    if found is None:
+        raise LookupError(f"No snapshot archived on or before {asof}")
+    result, computed_at = found
+    age = (datetime.now() - datetime.fromisoformat(computed_at)).total_seconds()
+    meta = {
+        'computed_at': computed_at,
+        'age_seconds': age,
+        'ttl_seconds': engine._cache_ttl,
+        'stale': age >= engine._cache_ttl,
+        'refreshing': False,
+        'asof': asof
+    }
+    return (select_fields(result, fields) if fields else result), meta
+
+def snapshot_response(fields=None):
+    asof = request.args.get('asof')
+    if asof:
+        try:
+            data, meta = archived_snapshot(asof, fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except LookupError as e:
+            return jsonify({"error": str(e)}), 404
+    else:
+        try:
+            data, meta = snapshots.get_fields(fields) if fields else snapshots.get_snapshot()
+        except TimeoutError as e:
+            return jsonify({"error": str(e)}), 503, {'Retry-After': '5'}
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    if g.get('profiler') is not None and is_producer():
+        # The snapshot read above is a dict lookup; profile the full pipeline on this thread instead
+        engine._compute_regime()
+    since = request.args.get('since')
+    compact = request.args.get('format') == 'compact' and not fields
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Snapshot-Computed-At': meta['computed_at'],
+        'X-Snapshot-Age': f"{meta['age_seconds']:.0f}",
+        'X-Snapshot-Stale': str(meta['stale']).lower()
+    }
+
+    if compact:
+        payload = payloads.get((meta['computed_at'], since), lambda: {
+            **compact_payload(data, since),
+            'meta': {'computed_at': meta['computed_at'], 'ttl_seconds': meta['ttl_seconds'], 'since': since}
+        })
+        etag, weak = payload.etag, False
+    else:
+        # The body embeds the snapshot age, so it only matches its snapshot weakly
+        version = ','.join(meta['sections'].values()) if 'sections' in meta else meta['computed_at']
+        etag, weak = f"{version}|{since}|{','.join(fields or [])}", True
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304, headers=headers)
+        response.set_etag(etag, weak)
+        return response
+
+    if compact:
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        response = Response(payload.encoded(encoding), mimetype='application/json', headers=headers)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+    else:
+        response = jsonify({**filter_since(data, since), 'meta': meta})
+        response.headers.update(headers)
+    response.set_etag(etag, weak)
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint. Each worker process reports its own counters."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/macro/stream')
+def stream_macro_data():
+    """Server-sent events: a full `snapshot` on connect, then a merge-patch `delta` per refresh."""
+    return Response(
+        broadcaster.stream(request.headers.get('Last-Event-ID')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/macro/archive')
+def get_macro_archive():
+    """Composite and components of the archived snapshots between `start` and `end` (dates or ISO
+    timestamps): the newest `limit` of them (at most RANGE_LIMIT), with `truncated` set if there were more."""
+    try:
+        limit = min(int(request.args.get('limit', RANGE_LIMIT)), RANGE_LIMIT)
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        rows = archive.range(request.args.get('start'), request.args.get('end'), limit=limit + 1)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    truncated = len(rows) > limit
+    rows = rows[len(rows) - limit:] if truncated else rows
+    names = list(rows[0][2]) if rows else []
+    return jsonify({
+        'truncated': truncated,
+        'computed_at': [r[0] for r in rows],
+        'composite': [r[1] for r in rows],
+        'components': {name: [r[2].get(name) for r in rows] for name in names}
+    })
+
+@app.route('/api/macro/history')
+def get_macro_history():
     try:
-        data = engine.calculate_regime()
-        return jsonify(data)
+        # Only the producer fetches upstream; other workers backtest on the shared store as it is
+        history = engine.calculate_history(request.args.get('start'), request.args.get('end'), fetch=is_producer())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    return jsonify({
+        'dates': history.index.strftime('%Y-%m-%d').tolist(),
+        'composite': history['composite'].tolist(),
+        'components': {k: history[k].tolist() for k in history.columns if k != 'composite'}
+    })
 
 if __name__ == "__main__":
     port = 3000
     print(f"🔥 Global Macro Compass Server running at http://localhost:{port}")
+    # The debug reloader imports this module twice; only the serving child refreshes
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        engine.start_background_refresh()
     app.run(host='0.0.0.0', port=port, debug=True)
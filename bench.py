@@ -0,0 +1,351 @@
+"""Offline benchmark suite for the regime engine.
+
+    python bench.py record                          # capture live upstream responses as fixtures
+    python bench.py run --output bench_output.json  # replay them and time every stage
+    python bench.py run --baseline baseline.json    # ...and fail on regressions
+    python bench.py run --save-baseline baseline.json
+    python bench.py run --cold-start                # also time a fresh process's boot and first response
+
+Fixtures live in bench_fixtures/ (FRED series as CSV, the yfinance close panel as CSV,
+the Alpha Vantage NEWS_SENTIMENT response as JSON). Without recorded fixtures a
+deterministic synthetic set in the same shape is generated in memory, so the suite
+always runs without network access. Larger universes are made by adding synthetic
+tickers to the recorded panel.
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from data_engine import CORE_ASSETS, FRED_SERIES, MacroEngine
+from payload import compact_payload
+from refresh_schedule import SERIES_FREQUENCY
+from series_store import SeriesStore
+from snapshot_archive import SnapshotArchive
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(ROOT, 'bench_fixtures')
+UNIVERSE_SIZES = [7, 100, 500]
+# Simulated round trip per upstream call, so the cold path measures fan-out rather than pure CPU
+LATENCY = {'fred': 0.15, 'market': 0.6, 'news': 0.3}
+# Run in a fresh interpreter: import the app, then serve one /api/macro from the primed snapshot
+COLD_START_SCRIPT = """
+import json, os, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+status = app.app.test_client().get('/api/macro').status_code
+done = time.perf_counter()
+print(json.dumps({'import_s': imported - start, 'first_response_s': done - start, 'status': status,
+                  'deferred': [m for m in ('pandas', 'numpy', 'yfinance', 'fredapi', 'requests') if m not in sys.modules]}))
+sys.stdout.flush()
+os._exit(0)  # skip joining the refresh threads; only boot is measured
+"""
+# A metric regresses when it is this much worse than the baseline...
+TOLERANCE = 0.20
+# ...and, for timings, worse by more than this many seconds (sub-millisecond jitter is not a regression)
+NOISE_FLOOR_S = 0.005
+
+
+class ReplayFred:
+    """fredapi.Fred stand-in serving recorded series (same call signatures)."""
+    def __init__(self, series, info=None, latency=0.0):
+        self.series = series
+        self.info = info or {}
+        self.latency = latency
+        self.calls = 0
+
+    def get_series(self, series_id, observation_start=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        s = self.series[series_id]
+        if observation_start is not None:
+            s = s[s.index >= pd.Timestamp(observation_start)]
+        return s.copy()
+
+    def get_series_info(self, series_id):
+        self.calls += 1
+        time.sleep(self.latency)
+        return pd.Series({'last_updated': self.info.get(series_id, 'recorded')})
+
+
+class ReplayDownload:
+    """yf.download stand-in serving a recorded close panel."""
+    def __init__(self, closes, latency=0.0):
+        self.closes = closes
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, tickers, period=None, start=None, progress=False, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        df = self.closes.reindex(columns=tickers)
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        elif period is not None:
+            months = int(period[:-1]) * 12 if period.endswith('y') else int(period.rstrip('mo'))
+            df = df[df.index >= df.index[-1] - pd.DateOffset(months=months)]
+        return pd.concat({'Close': df}, axis=1)
+
+
+class ReplayNews:
+    """Alpha Vantage NEWS_SENTIMENT stand-in returning a recorded response."""
+    def __init__(self, response, latency=0.0):
+        self.response = response
+        self.latency = latency
+
+    def __call__(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.response
+
+
+def record(root=FIXTURE_DIR, years=10):
+    """Capture live FRED, yfinance and Alpha Vantage responses (needs API keys and network)."""
+    engine = MacroEngine()
+    if engine.fred is None:
+        sys.exit("FRED_API_KEY is required to record fixtures")
+    os.makedirs(os.path.join(root, 'fred'), exist_ok=True)
+    info = {}
+    for sid in FRED_SERIES:
+        engine.fred.get_series(sid).rename(sid).to_csv(os.path.join(root, 'fred', f'{sid}.csv'))
+        info[sid] = str(engine.fred.get_series_info(sid)['last_updated'])
+    with open(os.path.join(root, 'fred', 'info.json'), 'w') as f:
+        json.dump(info, f, indent=2)
+    start = (pd.Timestamp.now() - pd.DateOffset(years=years)).strftime('%Y-%m-%d')
+    engine.download(list(CORE_ASSETS), start=start, progress=False)['Close'].to_csv(os.path.join(root, 'market.csv'))
+    news = engine.news() if engine.news else {'feed': []}
+    with open(os.path.join(root, 'news.json'), 'w') as f:
+        json.dump(news, f)
+    print(f"Recorded fixtures to {root}")
+
+
+def synthesize(years=10, seed=7):
+    """Deterministic fixture set with the shape and rough levels of the real inputs."""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp('2024-12-31')
+    start = end - pd.DateOffset(years=years)
+    levels = {
+        'T10Y3M': 0.5, 'DGS10': 4.0, 'T10YIE': 2.3, 'BAMLH0A0HYM2': 4.0, 'NFCI': -0.4, 'STLFSI4': 0.0,
+        'CPIAUCSL': 250.0, 'FEDFUNDS': 3.0, 'WALCL': 7.5e6, 'WTGANN': 750.0, 'RRPONTSYD': 500.0
+    }
+    freq = {'daily': 'B', 'weekly': 'W-WED', 'monthly': 'MS'}
+    series = {}
+    for sid, level in levels.items():
+        idx = pd.date_range(start, end, freq=freq[SERIES_FREQUENCY[sid]])
+        if sid == 'CPIAUCSL':
+            values = level * np.cumprod(1 + rng.normal(0.0025, 0.002, len(idx)))
+        else:
+            values = level + np.cumsum(rng.normal(0, abs(level) * 0.01 + 0.02, len(idx)))
+        series[sid] = pd.Series(values, index=idx, name=sid)
+    info = {sid: 'synthetic' for sid in series}
+
+    calendar = pd.bdate_range(start, end)
+    prices = {'SPY': 400, 'GLD': 180, 'HG=F': 4, 'DX-Y.NYB': 100, 'TLT': 100, 'XLK': 150, 'XLP': 70}
+    returns = rng.normal(0.0002, 0.01, (len(calendar), len(prices)))
+    closes = pd.DataFrame(np.array(list(prices.values())) * np.exp(np.cumsum(returns, axis=0)),
+                          index=calendar, columns=list(prices))
+    topics = ['Economy - Macro', 'Financial Markets', 'Technology', 'Energy & Transportation']
+    news = {'feed': [
+        {'url': f'https://news.example/{i}',
+         'time_published': (end - pd.Timedelta(minutes=30 * i)).strftime('%Y%m%dT%H%M%S'),
+         'overall_sentiment_score': float(x),
+         'ticker_sentiment': [{'ticker': t, 'relevance_score': '0.5', 'ticker_sentiment_score': f'{x:.4f}'}
+                              for t in rng.choice(list(prices), 2, replace=False)],
+         'topics': [{'topic': topics[i % len(topics)], 'relevance_score': '0.8'}]}
+        for i, x in enumerate(rng.normal(0.15, 0.2, 50))
+    ]}
+    return series, info, closes, news
+
+
+def load_fixtures(root=FIXTURE_DIR):
+    if not os.path.exists(os.path.join(root, 'market.csv')):
+        return synthesize() + ('synthetic',)
+    series = {}
+    for sid in FRED_SERIES:
+        s = pd.read_csv(os.path.join(root, 'fred', f'{sid}.csv'), index_col=0, parse_dates=True).iloc[:, 0]
+        series[sid] = s.dropna()
+    with open(os.path.join(root, 'fred', 'info.json')) as f:
+        info = json.load(f)
+    closes = pd.read_csv(os.path.join(root, 'market.csv'), index_col=0, parse_dates=True)
+    with open(os.path.join(root, 'news.json')) as f:
+        news = json.load(f)
+    return series, info, closes, news, 'recorded'
+
+
+def widen(closes, size, seed=11):
+    """Pad the core panel to `size` tickers with synthetic ones loosely tied to SPY."""
+    extra = size - closes.shape[1]
+    if extra <= 0:
+        return closes
+    rng = np.random.default_rng(seed)
+    spy = np.log(closes['SPY'].ffill().bfill()).diff().fillna(0).to_numpy()
+    beta = rng.uniform(0.2, 1.5, extra)
+    noise = rng.normal(0, 0.012, (len(closes), extra))
+    paths = 50 * np.exp(np.cumsum(spy[:, None] * beta + noise, axis=0))
+    synthetic = pd.DataFrame(paths, index=closes.index, columns=[f'SYN{i:03d}' for i in range(extra)])
+    return pd.concat([closes, synthetic], axis=1)
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def cold_start(snapshot, repeat=3):
+    """Import time and time to first /api/macro of fresh processes booting from an archived snapshot.
+
+    Returns (metrics, modules still unimported at first response). No upstream is reachable:
+    API keys are blanked and the snapshot is fresh, so the response must come from the archive.
+    """
+    scratch = tempfile.mkdtemp(prefix='macro-coldstart-')
+    archive = SnapshotArchive(os.path.join(scratch, 'snapshots.sqlite3'))
+    archive.append(snapshot, datetime.now().isoformat())
+    env = {**os.environ, 'SNAPSHOT_ARCHIVE': archive.path, 'SERIES_STORE_DIR': os.path.join(scratch, 'series'),
+           'FRED_API_KEY': '', 'ALPHA_VANTAGE_API_KEY': '', 'MACRO_SHARED_SNAPSHOT': ''}
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], env=env, cwd=ROOT,
+                             capture_output=True, text=True, check=True, timeout=120)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        if runs[-1]['status'] != 200:
+            raise RuntimeError(f"Cold start answered {runs[-1]['status']}")
+    return {
+        'cold_start_import_s': statistics.median(r['import_s'] for r in runs),
+        'cold_start_first_response_s': statistics.median(r['first_response_s'] for r in runs)
+    }, runs[-1]['deferred']
+
+
+def run(sizes=UNIVERSE_SIZES, repeat=3, latency=LATENCY, fixtures=None, boot=False):
+    """Time the cold path, warm paths, history backtest and payload encoding (and with `boot`,
+    process cold start). Returns a results dict."""
+    series, info, closes, news, source = fixtures or load_fixtures()
+    metrics = {}
+    scratch = tempfile.mkdtemp(prefix='macro-bench-')
+
+    def engine_for(panel, store_dir):
+        return MacroEngine(
+            store=SeriesStore(store_dir),
+            universe=[t for t in panel.columns if t not in CORE_ASSETS],
+            fred=ReplayFred(series, info, latency['fred']),
+            download=ReplayDownload(panel, latency['market']),
+            news=ReplayNews(news, latency['news'])
+        )
+
+    for size in sizes:
+        panel = widen(closes, size)
+        runs = iter(range(repeat))
+        engines = []
+
+        def cold():
+            engine = engine_for(panel, os.path.join(scratch, f'{size}-{next(runs)}'))
+            engine.calculate_regime()
+            engines.append(engine)
+
+        metrics[f'cold_s[{size}]'] = timed(cold, repeat)
+        engine = engines[-1]
+        metrics[f'warm_refresh_s[{size}]'] = timed(lambda: engine.refresh().result(), repeat)
+        metrics[f'warm_restart_s[{size}]'] = timed(
+            lambda: engine_for(panel, engine.store.root).calculate_regime(), repeat)
+
+        snapshot = engine.calculate_regime()
+        body = json.dumps(snapshot, separators=(',', ':'), default=float).encode('utf-8')
+        compact = json.dumps(compact_payload(snapshot), separators=(',', ':')).encode('utf-8')
+        metrics[f'payload_json_bytes[{size}]'] = len(body)
+        metrics[f'payload_json_encode_s[{size}]'] = timed(
+            lambda: json.dumps(snapshot, separators=(',', ':'), default=float), repeat)
+        metrics[f'payload_compact_bytes[{size}]'] = len(compact)
+        metrics[f'payload_compact_gzip_bytes[{size}]'] = len(gzip.compress(compact, compresslevel=6))
+        metrics[f'payload_compact_encode_s[{size}]'] = timed(
+            lambda: json.dumps(compact_payload(snapshot), separators=(',', ':')), repeat)
+
+    engine = engine_for(closes, os.path.join(scratch, 'history'))
+    start = closes.index[-1] - pd.DateOffset(years=5)
+    engine.calculate_history(start=start)
+    metrics['history_5y_s'] = timed(lambda: engine.calculate_history(start=start), repeat)
+
+    deferred = None
+    if boot:
+        boot_metrics, deferred = cold_start(engine.calculate_regime(), repeat)
+        metrics.update(boot_metrics)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'fixtures': source,
+            'latency': latency,
+            'repeat': repeat,
+            'deferred_imports': deferred
+        },
+        'metrics': metrics
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Print current vs baseline for every shared metric; returns the names that regressed."""
+    regressions = []
+    print(f"{'metric':<36}{'baseline':>14}{'current':>14}{'ratio':>8}")
+    for name, value in results['metrics'].items():
+        base = baseline['metrics'].get(name)
+        if base is None:
+            print(f"{name:<36}{'-':>14}{value:>14.4g}{'new':>8}")
+            continue
+        ratio = value / base if base else float('inf')
+        floor = NOISE_FLOOR_S if re.search(r'_s(\[|$)', name) else 0
+        flag = ''
+        if ratio > 1 + tolerance and value - base > floor:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<36}{base:>14.4g}{value:>14.4g}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['run', 'record'])
+    parser.add_argument('--fixtures', default=FIXTURE_DIR)
+    parser.add_argument('--sizes', default=','.join(map(str, UNIVERSE_SIZES)))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-latency', action='store_true', help="replay without simulated round trips")
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--save-baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--cold-start', action='store_true', help="also time process boot to first response")
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        record(args.fixtures)
+        return 0
+
+    latency = {k: 0.0 for k in LATENCY} if args.no_latency else LATENCY
+    results = run([int(s) for s in args.sizes.split(',')], args.repeat, latency, load_fixtures(args.fixtures),
+                  boot=args.cold_start)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        return 1 if regressions else 0
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
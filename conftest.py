@@ -0,0 +1,34 @@
+"""Fixtures shared by the test suite; the stand-ins they use live in fakes.py."""
+import pytest
+from fakes import SlowFred, offline_engine
+from snapshot_archive import SnapshotArchive
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The app module, imported once with its store and archive under a temp dir, not the real /tmp ones."""
+    root = tmp_path_factory.mktemp('app')
+    env = pytest.MonkeyPatch()
+    env.setenv('SERIES_STORE_DIR', str(root / 'series'))
+    env.setenv('SNAPSHOT_ARCHIVE', str(root / 'snapshots.sqlite3'))
+    env.delenv('MACRO_SHARED_SNAPSHOT', raising=False)
+    import app
+    yield app
+    env.undo()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return offline_engine(SlowFred(delay=0), tmp_path / 'store')
+
+
+@pytest.fixture
+def client(app_module, engine, tmp_path, monkeypatch):
+    """Test client of the app serving `engine`, archiving to `tmp_path`."""
+    archive = SnapshotArchive(str(tmp_path / 'archive.sqlite3'))
+    engine.subscribe(archive.append)
+    monkeypatch.setattr(app_module, 'engine', engine)
+    monkeypatch.setattr(app_module, 'snapshots', engine)
+    monkeypatch.setattr(app_module, 'archive', archive)
+    monkeypatch.setattr(app_module, 'payloads', app_module.PayloadCache())
+    return app_module.app.test_client()
@@ -1,177 +1,908 @@
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import requests
 import json
 import re
 from datetime import datetime, timedelta
-from fredapi import Fred
 import os
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from functools import partial
 from dotenv import load_dotenv
+from series_store import SeriesStore
+from refresh_schedule import PUBLICATION_LAG, RefreshSchedule
+from rolling import RollingWindow, horizon_stats, MOMENTUM_HORIZONS, CORRELATION_WINDOWS
+from payload import select_fields
+from news_sentiment import NewsClient, SentimentBook
+from metrics import STAGE_SECONDS, UPSTREAM_TIMEOUTS, UPSTREAM_SKIPPED, SNAPSHOT_REQUESTS, FALLBACKS, upstream_call
+from deferred import DeferredModule
+
+# Loaded on first use: a process serving a primed snapshot never needs them
+pd = DeferredModule('pandas')
+np = DeferredModule('numpy')
 
 load_dotenv()
 
+# FRED inputs to the regime, fetched concurrently on every refresh
+FRED_SERIES = [
+    'T10Y3M', 'DGS10', 'T10YIE', 'BAMLH0A0HYM2', 'NFCI', 'STLFSI4',
+    'CPIAUCSL', 'FEDFUNDS', 'WALCL', 'WTGANN', 'RRPONTSYD'
+]
+
+# Placeholder values, applied per derived input when its series is unavailable
+MACRO_FALLBACKS = {
+    'yield_10y3m': -0.6,
+    'real_yield': 2.1,
+    'hy_spread': 4.5,
+    'nfci': -0.5,
+    'stress_index': 0.2,
+    'inflation': 3.1,
+    'fed_funds': 5.33,
+    'net_liquidity': 6.5e12
+}
+
+# FRED series each derived macro input depends on
+MACRO_INPUTS = {
+    'yield_10y3m': ['T10Y3M'],
+    'real_yield': ['DGS10', 'T10YIE'],
+    'hy_spread': ['BAMLH0A0HYM2'],
+    'nfci': ['NFCI'],
+    'stress_index': ['STLFSI4'],
+    'inflation': ['CPIAUCSL'],
+    'fed_funds': ['FEDFUNDS'],
+    'net_liquidity': ['WALCL', 'WTGANN', 'RRPONTSYD']
+}
+
+# Applied to the native FRED series before taking the latest value or aligning it
+SERIES_TRANSFORMS = {
+    'CPIAUCSL': lambda s: s.pct_change(12) * 100  # YoY inflation from monthly CPI levels
+}
+
+# Derived macro inputs; work on scalars (latest observation) and aligned daily Series alike
+MACRO_FORMULAS = {
+    'yield_10y3m': lambda f: f['T10Y3M'],
+    'real_yield': lambda f: f['DGS10'] - f['T10YIE'], # Real Yield (10Y Nominal - 10Y Breakeven)
+    'hy_spread': lambda f: f['BAMLH0A0HYM2'],
+    'nfci': lambda f: f['NFCI'],
+    'stress_index': lambda f: f['STLFSI4'], # St. Louis Fed Stress Index
+    'inflation': lambda f: f['CPIAUCSL'],
+    'fed_funds': lambda f: f['FEDFUNDS'],
+    # WALCL in Millions, TGA and RRP in Billions of Dollars
+    'net_liquidity': lambda f: f['WALCL'] * 1e6 - f['WTGANN'] * 1e9 - f['RRPONTSYD'] * 1e9
+}
+
+# Factor order of the composite; RegimeParams tuples follow it
+COMPONENTS = ['Liquidity', 'Credit', 'Monetary', 'Growth', 'Appetite', 'Sentiment']
+
+# Tickers the regime itself depends on; always part of the asset universe
+CORE_ASSETS = {
+    'SPY': 'S&P 500',
+    'GLD': 'Gold',
+    'HG=F': 'Copper',
+    'DX-Y.NYB': 'US Dollar',
+    'TLT': 'Long-Term Bonds',
+    'XLK': 'Technology',
+    'XLP': 'Consumer Staples'
+}
+
+# Tickers per yf.download call; large universes are fetched in chunks
+DOWNLOAD_CHUNK = 100
+
+# Incremental downloads re-fetch this many days before the last stored close, and a settled
+# close in that overlap differing by more than the tolerance means yfinance re-adjusted the
+# history (split or dividend), so the stored closes are rescaled to match
+DOWNLOAD_OVERLAP = timedelta(days=7)
+ADJUSTMENT_TOLERANCE = 1e-4
+
+# Trailing window of daily closes the market metrics are computed over (pd.DateOffset arguments)
+MARKET_WINDOW = {'months': 6}
+# `raw.market` entries an apply_quotes tick recomputes, and so sends to quote subscribers
+QUOTE_FIELDS = ('momentum', 'cg_ratio', 'cg_momentum', 'rotation_raw', 'tlt_vol', 'correlation')
+# Sessions fed to the multi-horizon statistics: the longest momentum horizon plus a margin,
+# more than MARKET_WINDOW holds; the first download fetches a year so they are stored
+HORIZON_BARS = max(MOMENTUM_HORIZONS) + 21
+FIRST_DOWNLOAD = '1y'
+
+# Default lookback of calculate_history (pd.DateOffset arguments), and extra sessions loaded
+# ahead of it for momentum
+HISTORY_LOOKBACK = {'years': 5}
+MOMENTUM_WARMUP = timedelta(days=45)
+
+# Per-source timeouts in seconds, measured from the start of that source's fan-out
+FETCH_TIMEOUTS = {'fred': 10, 'market': 20, 'sentiment': 10}
+
+# Snapshot sections, each cached and refreshed on its own, and the sections each one is derived from
+SECTION_DEPENDENCIES = {
+    'macro': (),
+    'market': (),
+    'sentiment': (),
+    'scores': ('macro', 'market', 'sentiment'),
+    'summaries': ('macro', 'market', 'scores')
+}
+
+# Selectable snapshot fields (`raw.*` nest under `raw`) and the section each one is read from
+FIELD_SECTIONS = {
+    'composite': 'scores',
+    'components': 'scores',
+    'summaries': 'summaries',
+    'raw.fred': 'macro',
+    'raw.market': 'market',
+    'raw.sentiment': 'sentiment',
+    'raw.news': 'sentiment'
+}
+
+
+def _transform(series_id, series):
+    transform = SERIES_TRANSFORMS.get(series_id)
+    return transform(series) if transform else series
+
+
+def _published(series_id, series):
+    """`series` re-indexed by the date each observation became public."""
+    lag = PUBLICATION_LAG.get(series_id)
+    return series.set_axis(series.index + lag) if lag is not None else series
+
+
+def asof_align(series, calendar):
+    """As-of join: the last observation at or before each calendar date (NaN before the first)."""
+    series = series.dropna()
+    series = series[~series.index.duplicated(keep='last')]
+    return series.reindex(series.index.union(calendar)).ffill().reindex(calendar)
+
+
+@dataclass(frozen=True)
+class RegimeParams:
+    """Normalization and weighting of the composite score. Tuples follow COMPONENTS order."""
+    weights: tuple = (0.25, 0.20, 0.15, 0.15, 0.15, 0.10) # Institutional Weighting
+    divisors: tuple = (2e12, 2.5, 0.8, 0.15, 0.15, 0.5) # Liquidity to 2T, momentum loosened to 15%
+    liquidity_center: float = 6e12
+    credit_center: float = 4.5
+
+
+DEFAULT_PARAMS = RegimeParams()
+
+
+def component_inputs(liquidity, hy_spread, nfci, cg_momentum, rotation_raw, sentiment, params=DEFAULT_PARAMS):
+    """Signed raw inputs in COMPONENTS order: positive is risk-on, before scaling by the divisors."""
+    return [
+        liquidity - params.liquidity_center, # Net Liquidity
+        params.credit_center - hy_spread, # Credit Spreads
+        -nfci, # Financial Conditions
+        cg_momentum, # Copper/Gold Momentum
+        rotation_raw, # Risk appetite
+        sentiment
+    ]
+
+
+def normalize_components(liquidity, hy_spread, nfci, cg_momentum, rotation_raw, sentiment, params=DEFAULT_PARAMS):
+    """Map raw inputs onto [-1, 1] factor scores. Accepts scalars or aligned arrays."""
+    inputs = component_inputs(liquidity, hy_spread, nfci, cg_momentum, rotation_raw, sentiment, params)
+    return {name: np.clip(x / d, -1, 1) for name, x, d in zip(COMPONENTS, inputs, params.divisors)}
+
+
+def composite_score(components, params=DEFAULT_PARAMS):
+    """Weighted sum of the normalized components."""
+    return sum(components[name] * w for name, w in zip(COMPONENTS, params.weights))
+
+
+def history_inputs(fred_series, closes, sentiment=0.15):
+    """Raw regime inputs for every date in `closes`, with FRED series as-of joined onto that calendar.
+
+    Each date only sees observations published by then: an observation is dated ahead by its
+    series' PUBLICATION_LAG before the join. Missing series fall back to their placeholders,
+    and `sentiment` (no history upstream) is held flat.
+    """
+    calendar = closes.index
+    aligned = {sid: asof_align(_published(sid, _transform(sid, s)), calendar) for sid, s in fred_series.items()}
+    macro = {}
+    for name, inputs in MACRO_INPUTS.items():
+        if all(sid in aligned for sid in inputs):
+            macro[name] = MACRO_FORMULAS[name](aligned).fillna(MACRO_FALLBACKS[name])
+        else:
+            macro[name] = pd.Series(MACRO_FALLBACKS[name], index=calendar)
+
+    closes = closes.ffill().bfill()
+    return pd.DataFrame({
+        'liquidity': macro['net_liquidity'],
+        'hy_spread': macro['hy_spread'],
+        'nfci': macro['nfci'],
+        'cg_momentum': (closes['HG=F'] / closes['GLD']).pct_change(21),
+        'rotation_raw': (closes['XLK'] / closes['XLP']).pct_change(21),
+        'sentiment': sentiment
+    }, index=calendar)
+
+
+def composite_history(fred_series, closes, sentiment=0.15, params=DEFAULT_PARAMS):
+    """Composite score and components for every date in `closes`, in one vectorized pass."""
+    inputs = history_inputs(fred_series, closes, sentiment)
+    components = normalize_components(*(inputs[c].to_numpy() for c in inputs.columns), params=params)
+    history = pd.DataFrame(components, index=inputs.index)
+    history.insert(0, 'composite', np.clip(composite_score(components, params), -1, 1))
+    # The first 21 sessions have no momentum yet
+    return history.dropna()
+
+
+def _nullable(values):
+    """{key: float} with NaN as None, which JSON can carry."""
+    return {k: float(v) if v is not None and np.isfinite(v) else None for k, v in values.items()}
+
+
+def _yf_download(*args, **kwargs):
+    # yfinance (and fredapi, requests below) are imported on first use, keeping them off the boot path
+    import yfinance as yf
+    return yf.download(*args, **kwargs)
+
+
+class _LazyFred:
+    """fredapi.Fred, imported and constructed on first use."""
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self._fred = None
+
+    def __getattr__(self, name):
+        if self._fred is None:
+            from urllib.request import urlopen
+            import fredapi.fred
+            # fredapi calls urlopen without a timeout; a stalled socket would hold its worker forever
+            fredapi.fred.urlopen = partial(urlopen, timeout=FETCH_TIMEOUTS['fred'])
+            self._fred = fredapi.fred.Fred(api_key=self.api_key)
+        return getattr(self._fred, name)
+
+
+def parse_fields(spec):
+    """Field list from a `fields=` query value; `raw` stands for every `raw.*` field."""
+    fields = []
+    for name in (f.strip() for f in spec.split(',') if f.strip()):
+        expanded = [f for f in FIELD_SECTIONS if f.startswith('raw.')] if name == 'raw' else [name]
+        for field in expanded:
+            if field not in FIELD_SECTIONS:
+                raise ValueError(f"Unknown field '{field}'. Valid fields: raw, {', '.join(FIELD_SECTIONS)}")
+            if field not in fields:
+                fields.append(field)
+    if not fields:
+        raise ValueError("No fields requested")
+    return fields
+
+
+def _fingerprint(data):
+    """Cheap identity of a stored series/panel: the store only ever rewrites its tail."""
+    if data is None or len(data) == 0:
+        return None
+    return (data.shape, data.index[-1], np.asarray(data.iloc[-1]).tobytes())
+
+
 class MacroEngine:
-    def __init__(self):
+    def __init__(self, max_workers=16, store=None, universe=None, fred=None, download=None, news=None):
         self.fred_key = os.getenv("FRED_API_KEY")
         self.av_key = os.getenv("ALPHA_VANTAGE_API_KEY")
-        self.fred = Fred(api_key=self.fred_key) if self.fred_key else None
+        # Upstream fetchers; pass stand-ins (e.g. recorded fixtures) to run offline
+        self.fred = fred if fred is not None else (_LazyFred(self.fred_key) if self.fred_key else None)
+        self.download = download or _yf_download
+        # Local copy of every upstream series; refreshes only fetch what is newer
+        self.store = store if store is not None else SeriesStore()
+        # Decay-weighted news sentiment, kept next to the store so restarts only ingest new articles
+        self.sentiment = SentimentBook(os.path.join(self.store.root, 'sentiment.json'))
+        self.news = news or (NewsClient(self.av_key, timeout=FETCH_TIMEOUTS['sentiment'], since=self.sentiment.time_from,
+                                        quota_path=os.path.join(self.store.root, 'alpha_vantage_quota.json'))
+                             if self.av_key else None)
+        # Polls each input only when its publication frequency allows new data
+        self.schedule = RefreshSchedule()
+        self._derived = {}
+        self._history_start = None
+        self.params = DEFAULT_PARAMS
+        # Ticker -> display name; extra tickers come from `universe` or MACRO_UNIVERSE
+        self.assets = dict(CORE_ASSETS)
+        if universe is None:
+            universe = [t.strip() for t in os.getenv('MACRO_UNIVERSE', '').split(',') if t.strip()]
+        if not isinstance(universe, dict):
+            universe = {t: t for t in universe}
+        self.assets.update({t: name for t, name in universe.items() if t not in CORE_ASSETS})
+        # Shared, bounded pool. Late calls keep their worker until their socket timeout, but a
+        # FRED series is never fetched twice at once, so stuck calls cannot pile up across refreshes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='macro-fetch')
+        self._fred_inflight = {}
+        self._fred_lock = threading.Lock()
+        # Recomputes run one at a time on their own thread so they never wait on fetch workers
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='macro-refresh')
+        self._refresh_lock = threading.Lock()
+        self._inflight = None
+        self._listeners = []
+        self._quote_listeners = []
+        self._scheduler = None
+        self._stop = threading.Event()
         self._cache = None
         self._last_calc = None
+        self._last_full = None
         self._cache_ttl = 300 # 5 minutes
+        # Latest value of each section with its (monotonic, wall-clock) start time, and those in flight
+        self._sections = {}
+        self._section_inflight = {}
+        self._sections_lock = threading.Lock()
+        # One worker per section: each in-flight section holds at most one, so waits on dependencies cannot starve
+        self._section_pool = ThreadPoolExecutor(max_workers=len(SECTION_DEPENDENCIES), thread_name_prefix='macro-section')
+        # Market window of the last market refresh, advanced by apply_quotes
+        self._window_lock = threading.Lock()
+        self._window = None
+
+    def _fetch_fred(self, series_ids, deadline):
+        """Refresh FRED series concurrently. Series that fail or miss the deadline are served from the store.
+
+        A series whose previous fetch is still running is not submitted again; this refresh
+        waits on that same call instead.
+        """
+        with self._fred_lock:
+            futures = {}
+            for sid in series_ids:
+                future = self._fred_inflight.get(sid)
+                if future is None or future.done():
+                    future = self._fred_inflight[sid] = self._executor.submit(self._fetch_fred_series, sid)
+                futures[sid] = future
+        return self._with_stored(self._collect(futures, deadline, 'fred'), series_ids)
+
+    def _fetch_fred_series(self, series_id):
+        """Append observations newer than the last stored date and return the full stored series.
 
-    def get_net_liquidity(self):
-        """Calculate Net Liquidity: WALCL (Balance Sheet) - WTGANN (TGA) - RRPONTSYD (RRP)"""
-        if not self.fred:
-            return 6.5e12  # Placeholder ~6.5T
+        Upstream is skipped entirely until the series' next observation can exist, and once it
+        can, FRED's `last_updated` metadata is checked before any observations are requested.
+        """
+        last = self.store.last_date(series_id)
+        if last is not None and not self.schedule.due(series_id, last):
+            UPSTREAM_SKIPPED.inc(source='fred', reason='not_due')
+            return self.store.read(series_id)
         try:
-            walcl = self.fred.get_series('WALCL').iloc[-1] * 1e6 # Millions to Dollars
-            tga = self.fred.get_series('WTGANN').iloc[-1] * 1e9 # Billions to Dollars
-            rrp = self.fred.get_series('RRPONTSYD').iloc[-1] * 1e9 # Billions to Dollars
-            return walcl - tga - rrp
+            with upstream_call('fred_info'):
+                last_updated = self.fred.get_series_info(series_id)['last_updated']
         except Exception:
-            return 6.5e12
+            last_updated = None
+        if last is not None and last_updated is not None and last_updated == self.schedule.last_updated(series_id):
+            UPSTREAM_SKIPPED.inc(source='fred', reason='unchanged')
+            self.schedule.mark_checked(series_id)
+            return self.store.read(series_id)
+        with upstream_call('fred'):
+            if last is None:
+                new = self.fred.get_series(series_id)
+            else:
+                # Start at the last stored date so a revised final print overwrites it
+                new = self.fred.get_series(series_id, observation_start=last.strftime('%Y-%m-%d'))
+        self.store.upsert(series_id, new)
+        self.schedule.mark_checked(series_id, last_updated)
+        return self.store.read(series_id)
 
-    def calculate_regime(self):
-        """Fetch data and calculate the advanced institutional regime score. Includes 5-min caching."""
-        now = datetime.now()
-        if self._cache and self._last_calc and (now - self._last_calc).total_seconds() < self._cache_ttl:
-            return self._cache
+    def _with_stored(self, results, series_ids):
+        """`results` plus the stored copy of each series whose fetch failed, counted as a fallback."""
+        stored = self._stored(sid for sid in series_ids if sid not in results)
+        for sid in stored:
+            FALLBACKS.inc(input=sid, kind='stored')
+        return {**results, **stored}
 
-        # 1. Advanced Macro (FRED)
-        try:
-            if self.fred:
-                yield_10y3m = self.fred.get_series('T10Y3M').iloc[-1]
-                # Real Yield (10Y Nominal - 10Y Breakeven)
-                nom_10y = self.fred.get_series('DGS10').iloc[-1]
-                be_10y = self.fred.get_series('T10YIE').iloc[-1]
-                real_yield = nom_10y - be_10y
-                
-                # Credit Stress (HY Spread) & Financial Conditions (NFCI)
-                hy_spread = self.fred.get_series('BAMLH0A0HYM2').iloc[-1]
-                nfci = self.fred.get_series('NFCI').iloc[-1]
-                stress_index = self.fred.get_series('STLFSI4').iloc[-1] # St. Louis Fed Stress Index
-                
-                cpi = self.fred.get_series('CPIAUCSL')
-                inflation = cpi.pct_change(12).iloc[-1] * 100
-                fed_funds = self.fred.get_series('FEDFUNDS').iloc[-1]
-                liquidity = self.get_net_liquidity()
+    def _stored(self, series_ids):
+        """Stored copy of each of `series_ids` that has one."""
+        results = {}
+        for sid in series_ids:
+            try:
+                stored = self.store.read(sid)
+                if not stored.empty:
+                    results[sid] = stored
+            except Exception:
+                pass
+        return results
+
+    def _collect(self, futures, deadline, source):
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                UPSTREAM_TIMEOUTS.inc(source=source)
+                future.cancel()
+            except Exception:
+                future.cancel()
+        return results
+
+    def _market_chunks(self):
+        """(tickers, start) per yf.download call still needed; empty while the panel is not due.
+
+        Each chunk starts from its own oldest last stored date, or downloads the full window
+        (start=None) when one of its tickers has nothing stored yet.
+        """
+        tickers = list(self.assets.keys())
+        last_dates = {t: self.store.last_date(f'yf/{t}') for t in tickers}
+        if all(d is not None for d in last_dates.values()) and not self.schedule.due('market'):
+            UPSTREAM_SKIPPED.inc(source='market', reason='not_due')
+            return []
+        chunks = []
+        for i in range(0, len(tickers), DOWNLOAD_CHUNK):
+            chunk = tickers[i:i + DOWNLOAD_CHUNK]
+            dates = [last_dates[t] for t in chunk]
+            chunks.append((chunk, None if any(d is None for d in dates) else min(dates) - DOWNLOAD_OVERLAP))
+        return chunks
+
+    def _download_chunk(self, tickers, start=None):
+        # Adjusted closes, explicitly: the yfinance default has changed between releases
+        with upstream_call('market'):
+            if start is None:
+                df = self.download(tickers, period=FIRST_DOWNLOAD, auto_adjust=True, progress=False)['Close']
             else:
-                yield_10y3m, real_yield, hy_spread, nfci, stress_index, inflation, fed_funds, liquidity = -0.6, 2.1, 4.5, -0.5, 0.2, 3.1, 5.33, 6.5e12
-        except Exception:
-            yield_10y3m, real_yield, hy_spread, nfci, stress_index, inflation, fed_funds, liquidity = -0.6, 2.1, 4.5, -0.5, 0.2, 3.1, 5.33, 6.5e12
-
-        # 2. Market Dynamics (YFinance)
-        assets = {
-            'SPY': 'S&P 500', 
-            'GLD': 'Gold', 
-            'HG=F': 'Copper',
-            'DX-Y.NYB': 'Dollar Index',
-            'TLT': 'Long Bonds',
-            'XLK': 'Technology', 
-            'XLP': 'Staples'
+                df = self.download(tickers, start=start.strftime('%Y-%m-%d'), auto_adjust=True, progress=False)['Close']
+        for t in tickers:
+            if t in df:
+                self.store.upsert(f'yf/{t}', self._readjusted(f'yf/{t}', df[t].dropna()))
+
+    def _readjusted(self, key, new):
+        """`new` closes, preceded by the stored ones rescaled if yfinance has re-adjusted them since.
+
+        A split or dividend rescales every earlier adjusted close by one factor; it shows up as
+        a mismatch on the first settled close the download overlaps (the newest stored close
+        may still be moving intraday), and applies to everything stored before the download.
+        """
+        stored = self.store.read(key)
+        common = stored.index.intersection(new.index)
+        if len(common) < 2:
+            return new
+        ratio = new[common[0]] / stored[common[0]]
+        if not np.isfinite(ratio) or abs(ratio - 1) <= ADJUSTMENT_TOLERANCE:
+            return new
+        return pd.concat([stored[stored.index < new.index[0]] * ratio, new])
+
+    def _stored_market(self):
+        """Stored closes covering both MARKET_WINDOW and the last HORIZON_BARS sessions, gap-filled."""
+        df = pd.DataFrame({t: self.store.read(f'yf/{t}') for t in self.assets})
+        df = df[df.index >= min(df.index[-1] - pd.DateOffset(**MARKET_WINDOW), df.index[max(0, len(df) - HORIZON_BARS)])]
+        # Tickers with nothing stored (delisted, typo, failed first download) are left out
+        return df.ffill().bfill().dropna(axis=1, how='all')
+
+    def _market_history(self, start, fetch=True):
+        """Core asset closes from `start` onward, backfilling the store once (if `fetch`) when it
+        does not reach that far. Backtests read no other ticker, so the universe is never backfilled."""
+        tickers = list(CORE_ASSETS)
+        stored = {t: self.store.read(f'yf/{t}') for t in tickers}
+        short = any(s.empty or s.index[0] > start + pd.DateOffset(days=7) for s in stored.values())
+        if fetch and short and (self._history_start is None or start < self._history_start):
+            chunks = [tickers[i:i + DOWNLOAD_CHUNK] for i in range(0, len(tickers), DOWNLOAD_CHUNK)]
+            list(self._executor.map(lambda chunk: self._download_chunk(chunk, start), chunks))
+            self._history_start = start
+        return pd.DataFrame({t: self.store.read(f'yf/{t}', start=start) for t in tickers})
+
+    def calculate_history(self, start=None, end=None, fetch=True):
+        """Composite score and components for every market session between `start` and `end`.
+
+        Backtests use the stored FRED and market history; the whole range is computed in one
+        vectorized pass (see composite_history) rather than by replaying calculate_regime per date.
+        With `fetch=False` nothing is requested upstream and only what is stored is used.
+        """
+        start = pd.Timestamp(start) if start else pd.Timestamp.now().normalize() - pd.DateOffset(**HISTORY_LOOKBACK)
+        fred, closes = self.history_data(start, fetch)
+        history = composite_history(fred, closes, params=self.params)
+        history = history[history.index >= start]
+        if end:
+            history = history[history.index <= pd.Timestamp(end)]
+        return history
+
+    def history_data(self, start, fetch=True):
+        """Stored FRED series and market closes (with momentum warm-up) for backtests from `start`."""
+        if fetch and self.fred:
+            fred = self._fetch_fred(FRED_SERIES, time.monotonic() + FETCH_TIMEOUTS['fred'])
+        else:
+            # Nothing was attempted upstream, so nothing fell back
+            fred = self._stored(FRED_SERIES)
+        return fred, self._market_history(pd.Timestamp(start) - MOMENTUM_WARMUP, fetch)
+
+    def _fetch_sentiment(self):
+        """Fold new articles into the sentiment book; None when the call was rate limited."""
+        response = self.news()
+        return self.sentiment.ingest(response.get('feed', [])) if response else None
+
+    def _section_macro(self):
+        """Derived FRED inputs. Series that fail or miss the deadline come from the store."""
+        fred_series = {}
+        if self.fred:
+            fred_series = self._fetch_fred(FRED_SERIES, time.monotonic() + FETCH_TIMEOUTS['fred'])
+        return {
+            name: self._derive(name, [fred_series.get(sid) for sid in MACRO_INPUTS[name]],
+                               lambda name=name: self._macro_value(name, fred_series))
+            for name in MACRO_FALLBACKS
         }
+
+    def _section_market(self):
+        """Market statistics over the stored closes, after downloading whatever is due."""
+        start = time.monotonic()
+        futures = {i: self._executor.submit(self._download_chunk, *chunk)
+                   for i, chunk in enumerate(self._market_chunks())}
+        # Tickers in a failed or late chunk keep their stored closes
+        if futures and self._collect(futures, start + FETCH_TIMEOUTS['market'], 'market'):
+            self.schedule.mark_checked('market')
         try:
-            df = yf.download(list(assets.keys()), period='6mo', progress=False)['Close']
-            df = df.ffill().bfill()
+            df = self._stored_market()
+        except Exception:
+            df = None
+        market = self._derive('market', [df], lambda: self._market_values(df))
+        with self._window_lock:
+            # The memoized window stays untouched; quotes advance a private copy
+            self._window = market['window'].copy() if market['window'] is not None else None
+        return market
+
+    def _section_sentiment(self):
+        """Overall, per-ticker and per-topic news sentiment. A late or skipped call keeps the book as is."""
+        if self.news:
+            future = self._executor.submit(self._fetch_sentiment)
+            self._collect({'sentiment': future}, time.monotonic() + FETCH_TIMEOUTS['sentiment'], 'sentiment')
+        sentiment = self.sentiment.summary()
+        if sentiment['score'] is None:
+            FALLBACKS.inc(input='sentiment', kind='placeholder')
+            sentiment['score'] = 0.15
+        return sentiment
+
+    def _macro_value(self, name, series):
+        """Derive one macro input from the latest FRED observations, falling back to its placeholder."""
+        try:
+            latest = {sid: _transform(sid, series[sid]).iloc[-1] for sid in MACRO_INPUTS[name]}
+            return MACRO_FORMULAS[name](latest)
+        except Exception:
+            FALLBACKS.inc(input=name, kind='placeholder')
+            return MACRO_FALLBACKS[name]
+
+    def _derive(self, name, inputs, compute):
+        """Reuse the previous value of a derived quantity when none of its inputs changed."""
+        key = tuple(_fingerprint(x) for x in inputs)
+        cached = self._derived.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        value = compute()
+        self._derived[name] = (key, value)
+        return value
+
+    def _market_values(self, df):
+        """Momentum history plus the rolling-window statistics of the close panel, with placeholders on failure.
+
+        The history and rolling window cover MARKET_WINDOW; the horizon statistics the last HORIZON_BARS sessions.
+        """
+        assets = self.assets
+        try:
+            recent = df[df.index >= df.index[-1] - pd.DateOffset(**MARKET_WINDOW)]
             # 21-day rolling momentum for history
-            momentum_df = df.pct_change(21).dropna()
+            momentum_df = recent.pct_change(21).dropna()
             momentum_history = {
                 'dates': momentum_df.index.strftime('%Y-%m-%d').tolist(),
-                'series': {k: (momentum_df[k] * 100).tolist() for k in assets}
+                'series': {k: (momentum_df[k] * 100).tolist() for k in momentum_df.columns}
+            }
+            window = RollingWindow.from_frame(recent)
+            values = self._window_values(window)
+            stats = horizon_stats(df.iloc[-HORIZON_BARS:].to_numpy())
+            columns = list(df.columns)
+            horizons = {
+                'momentum': {h: dict(zip(columns, v.tolist())) for h, v in stats['momentum'].items()},
+                'correlation': {w: pd.DataFrame(c, index=columns, columns=columns) for w, c in stats['correlation'].items()},
+                'ewma_vol': dict(zip(columns, stats['ewma_vol'].tolist()))
             }
-            momentum = df.pct_change(21).iloc[-1].to_dict() # 21-day momentum
-            
-            # Growth Proxy: Copper / Gold ratio (Industrial vs Safe Haven)
-            ratio_series = (df['HG=F'] / df['GLD']).ffill().bfill()
-            cg_ratio = ratio_series.iloc[-1]
-            cg_momentum = ratio_series.pct_change(21).iloc[-1]
-            
-            # Risk Proxy: TLT Volatility (MOVE proxy)
-            tlt_vol = df['TLT'].pct_change().std() * np.sqrt(252) * 100
-            
-            # Sector Rotation: Tech vs Staples
-            rotation_series = (df['XLK'] / df['XLP']).ffill().bfill()
-            rotation_raw = rotation_series.pct_change(21).iloc[-1]
-            correlation = df.corr().to_dict()
         except Exception:
-            momentum = {k: 0.01 for k in assets}
+            FALLBACKS.inc(input='market', kind='placeholder')
             momentum_history = {'dates': [], 'series': {k: [] for k in assets}}
-            cg_ratio, cg_momentum, rotation_raw, tlt_vol = 0.0125, -0.11, -0.10, 15.0
-            correlation = {k: {k2: 1.0 if k==k2 else 0.5 for k2 in assets} for k in assets}
+            window = None
+            n = len(assets)
+            values = {
+                'momentum': {k: 0.01 for k in assets},
+                'cg_ratio': 0.0125, 'cg_momentum': -0.11, 'rotation_raw': -0.10, 'tlt_vol': 15.0,
+                'correlation': pd.DataFrame(np.full((n, n), 0.5) + np.eye(n) * 0.5, index=list(assets), columns=list(assets))
+            }
+            horizons = {
+                'momentum': {h: {} for h in MOMENTUM_HORIZONS},
+                'correlation': {w: pd.DataFrame() for w in CORRELATION_WINDOWS},
+                'ewma_vol': {}
+            }
+        market = {**values, 'momentum_history': momentum_history, 'horizons': horizons, 'window': window}
+        market['raw'] = self._raw_market(market)
+        return market
 
-        # 3. Sentiment (Alpha Vantage)
-        sentiment = 0.15
-        if self.av_key:
+    def _window_values(self, window):
+        """Latest market statistics read off a RollingWindow: O(assets²) whatever the window length."""
+        columns = window.columns
+        # Growth Proxy: Copper / Gold ratio (Industrial vs Safe Haven)
+        cg_ratio, cg_momentum = window.ratio('HG=F', 'GLD')
+        # Sector Rotation: Tech vs Staples
+        _, rotation_raw = window.ratio('XLK', 'XLP')
+        return {
+            'momentum': dict(zip(columns, window.momentum().tolist())), # 21-day momentum
+            'cg_ratio': cg_ratio,
+            'cg_momentum': cg_momentum,
+            'rotation_raw': rotation_raw,
+            # Risk Proxy: TLT Volatility (MOVE proxy)
+            'tlt_vol': window.volatility()[window.positions['TLT']],
+            'correlation': pd.DataFrame(window.correlation(), index=columns, columns=columns)
+        }
+
+    def apply_quotes(self, quotes, date=None):
+        """Fold live prices ({ticker: price}) into the market half of the snapshot and publish the change.
+
+        A `date` past the latest bar opens a new bar; otherwise the latest bar is revised. Each
+        call costs O(assets²) rather than a pass over the window. Macro and sentiment inputs and
+        the momentum history are those last computed; the next market refresh rebases the window
+        on stored closes.
+        """
+        with self._window_lock:
+            window = self._window
+            with self._sections_lock:
+                cached = dict(self._sections)
+            if window is None or any(name not in cached for name in SECTION_DEPENDENCIES):
+                raise RuntimeError("No market window yet; the first full refresh has not completed")
+            day = pd.Timestamp(date).normalize() if date is not None else None
+            if day is not None and window.last_date is not None and day > window.last_date:
+                window.push(quotes, day)
+            else:
+                window.revise(quotes)
+            with STAGE_SECONDS.time(stage='quotes'):
+                sections = {name: entry[0] for name, entry in cached.items()}
+                market = {**sections['market'], **self._window_values(window)}
+                market['raw'] = self._raw_market(market)
+                sections['market'] = market
+                sections['scores'] = self._section_scores(sections['macro'], market, sections['sentiment'])
+                sections['summaries'] = self._section_summaries(sections['macro'], market, sections['scores'])
+                result = self._render(sections)
+                # What a tick changes; momentum history and horizon statistics wait for the next refresh
+                update = {
+                    **{k: result[k] for k in ('composite', 'components', 'summaries')},
+                    'raw': {'market': {k: result['raw']['market'][k] for k in QUOTE_FIELDS}}
+                }
+            with self._sections_lock:
+                # Keep each section's start time so quotes never postpone its refresh
+                for name in ('market', 'scores', 'summaries'):
+                    self._sections[name] = (sections[name],) + cached[name][1:]
+            self._publish(result, update)
+        return result
+
+    def calculate_regime(self):
+        """Return the latest regime snapshot without waiting on upstream APIs (stale-while-revalidate).
+
+        Only the very first call blocks, on the shared in-flight computation. After that the
+        last good snapshot is served immediately and an expired one triggers a background refresh.
+        """
+        snapshot = self._cache
+        if snapshot is None:
+            SNAPSHOT_REQUESTS.inc(state='cold')
+            return self.refresh().result()
+        if self.snapshot_age() >= self._cache_ttl:
+            SNAPSHOT_REQUESTS.inc(state='stale')
+            self.refresh()
+        else:
+            SNAPSHOT_REQUESTS.inc(state='fresh')
+        return snapshot
+
+    def get_snapshot(self):
+        """calculate_regime() together with the meta block describing that same snapshot."""
+        while True:
+            result = self.calculate_regime()
+            with self._refresh_lock:
+                if self._cache is result:
+                    return result, self.snapshot_meta()
+
+    def refresh(self):
+        """Start a recompute unless one is already running (single-flight). Returns its Future."""
+        with self._refresh_lock:
+            if self._inflight is None:
+                self._inflight = self._refresher.submit(self._refresh_snapshot)
+            return self._inflight
+
+    def _refresh_snapshot(self):
+        try:
+            with STAGE_SECONDS.time(stage='compute'):
+                result = self._compute_regime()
+            self._publish(result)
+            return result
+        finally:
+            with self._refresh_lock:
+                self._inflight = None
+
+    def _publish(self, result, update=None):
+        """Serve `result`. A full refresh goes to subscribers; a quote tick only sends `update`
+        (the part it changed) to quote subscribers, so its cost does not grow with the window."""
+        with self._refresh_lock:
+            self._cache = result
+            self._last_calc = datetime.now()
+            if update is None:
+                self._last_full = self._last_calc
+        computed_at = self._last_calc.isoformat()
+        listeners = self._listeners if update is None else self._quote_listeners
+        for listener in list(listeners):
             try:
-                url = f'https://www.alphavantage.co/query?function=NEWS_SENTIMENT&apikey={self.av_key}'
-                r = requests.get(url).json()
-                scores = [float(i['overall_sentiment_score']) for i in r.get('feed', [])[:50]]
-                sentiment = np.mean(scores) if scores else 0.15
-            except Exception: pass
-
-        # 4. Professional Normalization
-        s_liquidity = np.clip((liquidity - 6e12) / 2e12, -1, 1) # Net Liquidity (Divisor to 2T)
-        s_credit = np.clip((4.5 - hy_spread) / 2.5, -1, 1) # Credit Spreads
-        s_conditions = np.clip(-nfci / 0.8, -1, 1) # Financial Conditions
-        s_growth = np.clip(cg_momentum / 0.15, -1, 1) # Copper/Gold Momentum (Loosened to 15%)
-        s_rotation = np.clip(rotation_raw / 0.15, -1, 1) # Risk appetite (Loosened to 15%)
-        s_sentiment = np.clip(sentiment / 0.5, -1, 1)
-
-        # Institutional Weighting
-        composite = (s_liquidity * 0.25) + (s_credit * 0.20) + (s_conditions * 0.15) + \
-                    (s_growth * 0.15) + (s_rotation * 0.15) + (s_sentiment * 0.10)
-
-        # Generate Summaries
-        summaries = {
-            'radar': self._get_radar_summary(
-                {'Liquidity': s_liquidity, 'Credit': s_credit, 'Monetary': s_conditions, 
-                 'Growth': s_growth, 'Appetite': s_rotation, 'Sentiment': s_sentiment}
-            ),
+                listener(result if update is None else update, computed_at)
+            except Exception:
+                pass
+
+    def prime(self, result, computed_at):
+        """Serve a persisted snapshot (e.g. the archive's latest) until the first refresh replaces it.
+
+        Its real age is kept, so an old one is served stale and refreshed in the background
+        rather than making the first request wait on a cold fetch.
+        """
+        with self._refresh_lock:
+            if self._cache is not None:
+                return
+            self._cache = result
+            self._last_calc = self._last_full = datetime.fromisoformat(computed_at)
+        for listener in list(self._listeners):
+            try:
+                listener(result, computed_at)
+            except Exception:
+                pass
+
+    def subscribe(self, listener):
+        """Call `listener(result, computed_at)` on the refresh thread after every full refresh."""
+        self._listeners.append(listener)
+
+    def subscribe_quotes(self, listener):
+        """Call `listener(update, computed_at)` after every apply_quotes tick.
+
+        `update` is a merge patch of the snapshot holding only what the tick recomputed
+        (scores, summaries and the latest market statistics; see QUOTE_FIELDS).
+        """
+        self._quote_listeners.append(listener)
+
+    def snapshot_age(self):
+        """Seconds since the last full refresh; quote updates do not reset it."""
+        if self._last_full is None:
+            return None
+        return (datetime.now() - self._last_full).total_seconds()
+
+    def snapshot_meta(self):
+        """Age and staleness of the snapshot currently being served."""
+        age = self.snapshot_age()
+        return {
+            'computed_at': self._last_calc.isoformat() if self._last_calc else None,
+            'age_seconds': age,
+            'ttl_seconds': self._cache_ttl,
+            'stale': age is None or age >= self._cache_ttl,
+            'refreshing': self._inflight is not None
+        }
+
+    def start_background_refresh(self, lead=0.8, retry=30):
+        """Rebuild the snapshot on a daemon thread once it reaches `lead` * TTL, so requests never see expiry."""
+        if self._scheduler and self._scheduler.is_alive():
+            return
+        self._stop.clear()
+        self._scheduler = threading.Thread(target=self._schedule_loop, args=(lead, retry),
+                                           name='macro-scheduler', daemon=True)
+        self._scheduler.start()
+
+    def stop_background_refresh(self):
+        self._stop.set()
+
+    def _schedule_loop(self, lead, retry):
+        while not self._stop.is_set():
+            age = self.snapshot_age()
+            wait = 0 if age is None else max(0, self._cache_ttl * lead - age)
+            if self._stop.wait(wait):
+                return
+            try:
+                self.refresh().result()
+            except Exception:
+                # Keep serving the last good snapshot and try again shortly
+                self._stop.wait(retry)
+
+    def _compute_regime(self):
+        """Fetch data and calculate the advanced institutional regime score."""
+        since = time.monotonic()
+        futures = {name: self._section_future(name, since) for name in SECTION_DEPENDENCIES}
+        return self._render({name: future.result() for name, future in futures.items()})
+
+    def _section_future(self, name, since):
+        """Future for a section, reusing a value started at or after `since` (monotonic) or one in flight."""
+        with self._sections_lock:
+            cached = self._sections.get(name)
+            if cached is not None and cached[1] >= since:
+                future = Future()
+                future.set_result(cached[0])
+                return future
+            future = self._section_inflight.get(name)
+            if future is None:
+                future = self._section_pool.submit(self._compute_section, name, since)
+                self._section_inflight[name] = future
+            return future
+
+    def _compute_section(self, name, since):
+        started = (time.monotonic(), datetime.now())
+        try:
+            # Start every dependency before waiting on any, so independent fetches overlap
+            deps = [self._section_future(dep, since) for dep in SECTION_DEPENDENCIES[name]]
+            args = [dep.result() for dep in deps]
+            with STAGE_SECONDS.time(stage=name):
+                value = getattr(self, f'_section_{name}')(*args)
+            with self._sections_lock:
+                self._sections[name] = (value,) + started
+            return value
+        finally:
+            with self._sections_lock:
+                self._section_inflight.pop(name, None)
+
+    def get_fields(self, fields):
+        """(partial snapshot, meta) holding only `fields`, computing just the sections they need.
+
+        Each section is served stale-while-revalidate like the full snapshot: an expired one is
+        returned as is while it refreshes in the background, and only a never-computed one blocks.
+        """
+        needed = list(dict.fromkeys(FIELD_SECTIONS[f] for f in fields))
+        cutoff = time.monotonic() - self._cache_ttl
+        with self._sections_lock:
+            cached = {name: self._sections.get(name) for name in needed}
+        pending = {name: self._section_future(name, cutoff) for name, entry in cached.items()
+                   if entry is None or entry[1] < cutoff}
+        cold = [name for name in needed if cached[name] is None]
+        if cold and self._cache is not None:
+            # Sections not computed since boot yet: answer from the primed snapshot meanwhile
+            SNAPSHOT_REQUESTS.inc(state='stale')
+            return select_fields(self._cache, fields), self.snapshot_meta()
+        SNAPSHOT_REQUESTS.inc(state='cold' if cold else 'stale' if pending else 'fresh')
+        for name in cold:
+            pending[name].result()
+        with self._sections_lock:
+            entries = {name: self._sections[name] for name in needed}
+
+        oldest = min(entry[2] for entry in entries.values())
+        age = (datetime.now() - oldest).total_seconds()
+        meta = {
+            'computed_at': oldest.isoformat(),
+            'age_seconds': age,
+            'ttl_seconds': self._cache_ttl,
+            'stale': age >= self._cache_ttl,
+            'refreshing': any(not f.done() for f in pending.values()),
+            'sections': {name: entry[2].isoformat() for name, entry in entries.items()}
+        }
+        return self._render({name: entry[0] for name, entry in entries.items()}, fields), meta
+
+    def _section_scores(self, macro, market, sentiment):
+        """Normalized components and the composite score."""
+        components = normalize_components(macro['net_liquidity'], macro['hy_spread'], macro['nfci'],
+                                          market['cg_momentum'], market['rotation_raw'], sentiment['score'], self.params)
+        return {
+            'composite': float(np.clip(composite_score(components, self.params), -1, 1)),
+            'components': {name: float(components[name]) for name in COMPONENTS}
+        }
+
+    def _section_summaries(self, macro, market, scores):
+        return {
+            'radar': self._get_radar_summary(scores['components']),
             'plumbing': self._get_plumbing_summary(
-                {'hy_spread': hy_spread, 'stress_index': stress_index, 'yield_10y3m': yield_10y3m, 'nfci': nfci},
-                {'tlt_vol': tlt_vol}
+                {'hy_spread': macro['hy_spread'], 'stress_index': macro['stress_index'],
+                 'yield_10y3m': macro['yield_10y3m'], 'nfci': macro['nfci']},
+                {'tlt_vol': market['tlt_vol']}
             ),
-            'growth': self._get_growth_summary(cg_momentum, rotation_raw),
-            'momentum': self._get_momentum_summary(momentum),
-            'correlation': self._get_correlation_summary(correlation)
+            'growth': self._get_growth_summary(market['cg_momentum'], market['rotation_raw']),
+            'momentum': self._get_momentum_summary(market['momentum']),
+            'trend': self._get_trend_summary(market['horizons']['momentum']),
+            'correlation': self._get_correlation_summary(market['correlation'], rolling=market['horizons']['correlation'])
         }
 
-        result = {
-            'composite': float(np.clip(composite, -1, 1)),
-            'components': {
-                'Liquidity': float(s_liquidity),
-                'Credit': float(s_credit),
-                'Monetary': float(s_conditions),
-                'Growth': float(s_growth),
-                'Appetite': float(s_rotation),
-                'Sentiment': float(s_sentiment)
-            },
-            'summaries': summaries,
-            'raw': {
-                'fred': {
-                    'yield_10y3m': float(yield_10y3m),
-                    'real_yield': float(real_yield),
-                    'hy_spread': float(hy_spread),
-                    'nfci': float(nfci),
-                    'stress_index': float(stress_index),
-                    'inflation': float(inflation),
-                    'fed_funds': float(fed_funds),
-                    'net_liquidity': float(liquidity)
-                },
-                'market': {
-                    'momentum': momentum,
-                    'momentum_history': momentum_history,
-                    'cg_ratio': float(cg_ratio),
-                    'cg_momentum': float(cg_momentum) if not np.isnan(cg_momentum) else 0.0,
-                    'rotation_raw': float(rotation_raw),
-                    'tlt_vol': float(tlt_vol),
-                    'correlation': correlation
-                }
-            }
+    def _raw_market(self, market):
+        """JSON-ready `raw.market` block."""
+        cg_momentum, horizons = market['cg_momentum'], market['horizons']
+        return {
+            'momentum': market['momentum'],
+            'momentum_history': market['momentum_history'],
+            'cg_ratio': float(market['cg_ratio']),
+            'cg_momentum': float(cg_momentum) if not np.isnan(cg_momentum) else 0.0,
+            'rotation_raw': float(market['rotation_raw']),
+            'tlt_vol': float(market['tlt_vol']),
+            'correlation': market['correlation'].to_dict(),
+            'momentum_horizons': {f'{h}d': _nullable(v) for h, v in horizons['momentum'].items()},
+            'rolling_correlation': {f'{w}d': {k: _nullable(col) for k, col in c.to_dict().items()}
+                                    for w, c in horizons['correlation'].items()},
+            'ewma_vol': _nullable(horizons['ewma_vol'])
+        }
+
+    def _render(self, sections, fields=FIELD_SECTIONS):
+        """Snapshot dict of `fields` from section values (the full snapshot by default)."""
+        values = {
+            'composite': lambda: sections['scores']['composite'],
+            'components': lambda: sections['scores']['components'],
+            'summaries': lambda: sections['summaries'],
+            'raw.fred': lambda: {name: float(v) for name, v in sections['macro'].items()},
+            'raw.market': lambda: sections['market']['raw'],
+            'raw.sentiment': lambda: float(sections['sentiment']['score']),
+            'raw.news': lambda: {k: v for k, v in sections['sentiment'].items() if k != 'score'}
         }
-        self._cache = result
-        self._last_calc = now
+        result = {}
+        for field in fields:
+            if field.startswith('raw.'):
+                result.setdefault('raw', {})[field[4:]] = values[field]()
+            else:
+                result[field] = values[field]()
         return result
 
     def _get_radar_summary(self, components):
@@ -275,13 +1006,12 @@ class MacroEngine:
             }
 
     def _get_momentum_summary(self, momentum):
-        asset_names = {
-            'SPY': 'S&P 500', 'GLD': 'Gold', 'HG=F': 'Copper',
-            'DX-Y.NYB': 'US Dollar', 'TLT': 'Long-Term Bonds',
-            'XLK': 'Technology', 'XLP': 'Consumer Staples'
-        }
+        asset_names = self.assets
         
-        sorted_mom = sorted(momentum.items(), key=lambda x: x[1], reverse=True)
+        # The conclusions below are written for the core assets, so only they can lead or lag;
+        # breadth counts the whole universe
+        core = {t: v for t, v in momentum.items() if t in CORE_ASSETS} or momentum
+        sorted_mom = sorted(core.items(), key=lambda x: x[1], reverse=True)
         leader = sorted_mom[0]
         laggard = sorted_mom[-1]
         
@@ -335,24 +1065,52 @@ class MacroEngine:
                 'leader_color': 'bg-terminal-bullish' if leader[1] > 0 else 'bg-terminal-bearish'
             }
 
-    def _get_correlation_summary(self, correlation):
-        assets = list(correlation.keys())
+    def _get_trend_summary(self, horizon_momentum):
+        """Momentum breadth per horizon, and whether short- and long-term trends agree."""
+        breadth = {}
+        for h, values in horizon_momentum.items():
+            finite = [v for v in values.values() if np.isfinite(v)]
+            if finite:
+                breadth[f'{h}d'] = sum(1 for v in finite if v > 0) / len(finite) * 100
+        spy = {f'{h}d': values['SPY'] for h, values in horizon_momentum.items()
+               if np.isfinite(values.get('SPY', np.nan))}
+        if len(breadth) < 2:
+            return {'conclusion': "Insufficient data for multi-horizon trend analysis.", 'breadth': breadth, 'spy': spy}
+
+        short, long = breadth[next(iter(breadth))], breadth[list(breadth)[-1]]
+        if short >= 60 and long >= 60:
+            conclusion, status, color = "Trends are aligned to the upside. Short- and long-horizon momentum agree, a persistent Risk-On backdrop rather than a tactical bounce.", "ALIGNED-UP", "text-terminal-bullish"
+        elif short <= 40 and long <= 40:
+            conclusion, status, color = "Trends are aligned to the downside. Weakness is broad across every horizon, consistent with a structural de-risking phase.", "ALIGNED-DOWN", "text-terminal-bearish"
+        elif short < long - 20:
+            conclusion, status, color = "Short-term momentum is rolling over against a still-positive longer trend. A pullback is underway; watch whether it matures into a trend change.", "FADING", "text-yellow-500"
+        elif short > long + 20:
+            conclusion, status, color = "Short-term momentum is recovering against a weak longer trend. Early signs of a turn, not yet confirmed by the slower horizons.", "RECOVERING", "text-terminal-accent"
+        else:
+            conclusion, status, color = "Momentum is mixed across horizons without a decisive divergence between short- and long-term trends.", "MIXED", "text-terminal-accent"
+        return {'conclusion': conclusion, 'status': status, 'color': color, 'breadth': breadth, 'spy': spy}
+
+    def _get_correlation_summary(self, correlation, top=5, rolling=None):
+        assets = list(correlation.columns)
         if not assets or 'SPY' not in correlation:
             return {'conclusion': "Insufficient data for correlation analysis."}
             
-        pairs = []
-        for i, r in enumerate(assets):
-            for j, c in enumerate(assets):
-                if i < j:
-                    pairs.append({'p': [r, c], 'v': correlation[r].get(c, 0)})
+        # Each unordered pair once: upper triangle of the correlation matrix
+        rows, cols = np.triu_indices(len(assets), k=1)
+        values = correlation.to_numpy()[rows, cols]
+        valid = ~np.isnan(values)
+        rows, cols, values = rows[valid], cols[valid], values[valid]
         
-        if not pairs:
+        if not len(values):
              return {'conclusion': "Insufficient data for correlation analysis."}
 
-        sorted_pairs = sorted(pairs, key=lambda x: x['v'], reverse=True)
-        strongest = sorted_pairs[0]
-        weakest = sorted_pairs[-1]
-        avg_abs_corr = sum(abs(p['v']) for p in pairs) / len(pairs)
+        k = min(top, len(values))
+        strongest = np.argpartition(-values, k - 1)[:k]
+        strongest = strongest[np.argsort(-values[strongest], kind='stable')]
+        weakest = np.argpartition(values, k - 1)[:k]
+        weakest = weakest[np.argsort(values[weakest], kind='stable')]
+        pair = lambda i: {'pair': f'{assets[rows[i]]}/{assets[cols[i]]}', 'val': float(values[i])}
+        avg_abs_corr = float(np.abs(values).mean())
         
         if avg_abs_corr > 0.6:
             conclusion = "Strong Systemic Tie-In. High correlation across all asset classes indicates a macro-dominated environment where 'Everything is one trade' (likely Liquidity or Dollar driven)."
@@ -361,13 +1119,30 @@ class MacroEngine:
         else:
             conclusion = "Balanced Structural Alignment. Standard correlation levels suggest normal market functioning without extreme systemic synchronization."
             
-        spy_gld = correlation['SPY'].get('GLD', 0)
+        spy_gld = correlation.at['SPY', 'GLD'] if 'GLD' in correlation else 0
         if spy_gld < -0.4:
             conclusion += " Notable active hedge between Equities and Gold."
-            
+
+        # Average |correlation| of daily returns per rolling window, shortest first
+        rolling_avg = {}
+        for w, matrix in sorted((rolling or {}).items()):
+            upper = matrix.to_numpy()[np.triu_indices(len(matrix), k=1)]
+            upper = upper[~np.isnan(upper)]
+            if len(upper):
+                rolling_avg[f'{w}d'] = float(np.abs(upper).mean())
+        if len(rolling_avg) >= 2:
+            short, long = rolling_avg[next(iter(rolling_avg))], rolling_avg[list(rolling_avg)[-1]]
+            if short - long > 0.1:
+                conclusion += " Return correlations are rising on the short window, a common precursor of risk-off de-grossing."
+            elif long - short > 0.1:
+                conclusion += " Return correlations are easing on the short window as dispersion returns."
+
         return {
             'conclusion': conclusion,
-            'strongest': {'pair': '/'.join(strongest['p']), 'val': strongest['v']},
-            'weakest': {'pair': '/'.join(weakest['p']), 'val': weakest['v']},
-            'tension': avg_abs_corr * 10
+            'strongest': pair(strongest[0]),
+            'weakest': pair(weakest[0]),
+            'top_strongest': [pair(i) for i in strongest],
+            'top_weakest': [pair(i) for i in weakest],
+            'tension': avg_abs_corr * 10,
+            'rolling_avg_abs': rolling_avg
         }
@@ -0,0 +1,17 @@
+import importlib
+
+
+class DeferredModule:
+    """A module imported on first attribute access.
+
+    The modules the app imports at boot refer to pandas and numpy through these, so a process
+    serving a primed snapshot does not load them until something computes.
+    """
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._name), attr)
+        # Later lookups of the same name hit the instance and skip this method
+        setattr(self, attr, value)
+        return value
@@ -0,0 +1,69 @@
+"""Offline stand-ins for the upstream APIs and the clock, shared by the tests."""
+import threading
+import time
+import numpy as np
+import pandas as pd
+from data_engine import CORE_ASSETS, MacroEngine
+from series_store import SeriesStore
+
+
+class SlowFred:
+    """Stand-in for fredapi.Fred: every call takes `delay` seconds, `broken` ids raise."""
+    def __init__(self, delay=0.2, broken=()):
+        self.delay = delay
+        self.broken = set(broken)
+
+    def get_series(self, series_id, **kwargs):
+        time.sleep(self.delay)
+        if series_id in self.broken:
+            raise ValueError(f"{series_id} unavailable")
+        idx = pd.date_range('2023-01-01', periods=24, freq='MS')
+        return pd.Series(np.linspace(100, 110, len(idx)), index=idx)
+
+
+class CountingFred(SlowFred):
+    def __init__(self, delay):
+        super().__init__(delay=delay)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_series(self, series_id, **kwargs):
+        with self._lock:
+            self.calls += 1
+        return super().get_series(series_id)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def synthetic_market(assets, days=130):
+    idx = pd.bdate_range(end='2024-06-28', periods=days)
+    rng = np.random.default_rng(7)
+    data = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (days, len(assets))), axis=0))
+    return pd.DataFrame(data, index=idx, columns=list(assets))
+
+
+class FakeDownload:
+    """Stand-in for yf.download serving a fixed close panel, recording each request."""
+    def __init__(self, panel):
+        self.panel = panel
+        self.calls = []
+
+    def __call__(self, tickers, period=None, start=None, progress=False, **kwargs):
+        self.calls.append({'period': period, 'start': start})
+        df = self.panel[tickers]
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        return pd.concat({'Close': df}, axis=1)
+
+
+def offline_engine(fred, store_dir):
+    engine = MacroEngine(store=SeriesStore(str(store_dir)), fred=fred,
+                         download=FakeDownload(synthetic_market(CORE_ASSETS)))
+    engine.news = None
+    return engine
@@ -0,0 +1,25 @@
+"""Multi-worker production serving: gunicorn -c gunicorn.conf.py app:app
+
+Every worker serves /api/macro from one shared snapshot file; a single elected worker
+runs the engine, so upstream APIs see one fetch cycle per refresh regardless of the
+number of workers.
+"""
+import multiprocessing
+import os
+import tempfile
+
+os.environ.setdefault('MACRO_SHARED_SNAPSHOT', os.path.join(tempfile.gettempdir(), 'macro_compass', 'snapshot.json'))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '3000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Workers import the app after forking so their snapshot watcher threads exist
+preload_app = False
+
+try:
+    import gevent
+    # Cheap idle /api/macro/stream connections
+    worker_class = 'gevent'
+    worker_connections = 2000
+except ImportError:
+    worker_class = 'gthread'
+    threads = 8
@@ -0,0 +1,194 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from pyinstrument import Profiler as _Sampler
+except ImportError:  # optional: cProfile is always available, at a higher per-call overhead
+    _Sampler = None
+
+# Latency buckets in seconds, from cache reads up to slow upstream calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{k}="{str(v)}"' for k, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(labels.get(k, '') for k in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_one(key, value))
+        return lines
+
+    def _render_one(self, key, value):
+        return [f'{self.name}{_labels(self.label_names, key)} {value}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Gauge whose value is read from `fn()` at scrape time."""
+    kind = 'gauge'
+
+    def __init__(self, name, help, fn):
+        super().__init__(name, help)
+        self.fn = fn
+
+    def render(self):
+        value = self.fn()
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        return lines + ([f'{self.name} {value}'] if value is not None else [])
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts = [c + (value <= b) for c, b in zip(counts, self.buckets)]
+            self._values[key] = (counts, total + value, n + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        return self._values.get(self._key(labels), (None, 0.0, 0))[2]
+
+    def _render_one(self, key, value):
+        counts, total, n = value
+        names = self.label_names + ('le',)
+        lines = [f'{self.name}_bucket{_labels(names, key + (b,))} {c}' for b, c in zip(self.buckets, counts)]
+        lines.append(f'{self.name}_bucket{_labels(names, key + ("+Inf",))} {n}')
+        lines.append(f'{self.name}_sum{_labels(self.label_names, key)} {total}')
+        lines.append(f'{self.name}_count{_labels(self.label_names, key)} {n}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, fn):
+        return self.register(Gauge(name, help, fn))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'macro_stage_seconds', 'Time spent in each stage of a regime computation or request.', ['stage'])
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    'macro_upstream_seconds', 'Latency of upstream API calls.', ['source'])
+UPSTREAM_CALLS = REGISTRY.counter(
+    'macro_upstream_calls_total', 'Upstream API calls by outcome (ok, error).', ['source', 'outcome'])
+UPSTREAM_TIMEOUTS = REGISTRY.counter(
+    'macro_upstream_timeouts_total', 'Upstream calls abandoned at their source deadline.', ['source'])
+UPSTREAM_SKIPPED = REGISTRY.counter(
+    'macro_upstream_skipped_total',
+    'Upstream polls skipped by the refresh schedule (not_due, unchanged), a cached response (cached) or the quota (rate_limited).',
+    ['source', 'reason'])
+REQUEST_SECONDS = REGISTRY.histogram(
+    'macro_request_seconds', 'HTTP request latency by endpoint.', ['endpoint', 'status'])
+SNAPSHOT_REQUESTS = REGISTRY.counter(
+    'macro_snapshot_requests_total', 'Snapshot reads by cache state (fresh, stale, cold).', ['state'])
+FALLBACKS = REGISTRY.counter(
+    'macro_fallback_total', 'Placeholder values or stored copies substituted for failed inputs.', ['input', 'kind'])
+
+
+@contextmanager
+def upstream_call(source):
+    """Time one upstream call and count its outcome."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_CALLS.inc(source=source, outcome='error')
+        raise
+    else:
+        UPSTREAM_CALLS.inc(source=source, outcome='ok')
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, source=source)
+
+
+class RequestProfiler:
+    """Profile one request: pyinstrument's sampling profiler when installed, else cProfile."""
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self._profiler = None
+
+    def start(self):
+        if _Sampler is not None:
+            self._profiler = _Sampler(interval=self.interval)
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self, limit=40):
+        """Stop and return a plain-text report."""
+        if _Sampler is not None:
+            self._profiler.stop()
+            return self._profiler.output_text()
+        self._profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from metrics import UPSTREAM_SKIPPED, upstream_call
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: only threads of one process share a bucket
+    fcntl = None
+
+ALPHA_VANTAGE_URL = 'https://www.alphavantage.co/query'
+
+# Requests per period allowed by the Alpha Vantage key (free tier: 25 a day)
+DEFAULT_QUOTA = '25/day'
+QUOTA_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Articles older than one half-life count half as much in the aggregates
+SENTIMENT_HALF_LIFE = 24 * 3600
+# How long article ids are remembered for de-duplication (the feed never reaches further back)
+SEEN_RETENTION = 7 * 86400
+# Aggregates whose decayed weight drops below this are forgotten
+MIN_WEIGHT = 1e-4
+# Articles per call: a call costs one unit of quota whatever its size
+FEED_LIMIT = 1000
+
+TIME_FORMAT = '%Y%m%dT%H%M%S'
+
+
+def parse_quota(spec):
+    """'25/day' -> (25, 86400)."""
+    count, _, period = spec.partition('/')
+    if period not in QUOTA_PERIODS or not count.strip().isdigit() or int(count) < 1:
+        raise ValueError(f'Invalid quota {spec!r}; expected e.g. 25/day or 75/minute')
+    return int(count), QUOTA_PERIODS[period]
+
+
+def _published(stamp):
+    """Epoch seconds of an Alpha Vantage `time_published` (YYYYMMDDTHHMMSS, UTC)."""
+    for fmt in (TIME_FORMAT, '%Y%m%dT%H%M'):
+        try:
+            return datetime.strptime(stamp, fmt).replace(tzinfo=timezone.utc).timestamp()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class TokenBucket:
+    """Refills `rate` tokens every `per` seconds, holding at most `capacity` (default: `rate`).
+
+    With a `path` the tokens and their timestamp live in that file, read and rewritten under an
+    flock on every acquire, so restarts and other processes on the host draw from one allowance.
+    `clock` must then be wall-clock time.
+    """
+    def __init__(self, rate, per, capacity=None, clock=time.time, path=None):
+        self.rate = rate / per
+        self.capacity = capacity or rate
+        self.path = path
+        self._clock = clock
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens, updated):
+        """(allowed, tokens, updated) after refilling up to now and taking one token if there is one."""
+        now = self._clock()
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        if tokens < 1:
+            return False, tokens, now
+        return True, tokens - 1, now
+
+    def try_acquire(self):
+        """Take one token if available; never blocks."""
+        with self._lock:
+            if self.path is None:
+                allowed, self._tokens, self._updated = self._take(self._tokens, self._updated)
+                return allowed
+            with open(self.path, 'a+') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                try:
+                    state = json.loads(f.read())
+                    tokens, updated = float(state['tokens']), float(state['updated'])
+                except (ValueError, KeyError, TypeError):
+                    # First use (or an unreadable file): start full
+                    tokens, updated = float(self.capacity), self._clock()
+                allowed, tokens, updated = self._take(tokens, updated)
+                f.seek(0)
+                f.truncate()
+                json.dump({'tokens': tokens, 'updated': updated}, f)
+            return allowed
+
+
+class NewsClient:
+    """Alpha Vantage NEWS_SENTIMENT over a pooled session, within the key's quota.
+
+    Responses are cached per time window (by default the quota spread evenly over its
+    period), so refreshes inside a window reuse the last response instead of spending a
+    call. A call the bucket cannot cover returns None: callers keep their aggregates. Pass
+    `quota_path` to keep the bucket on disk, so restarts do not get a fresh allowance.
+    """
+    def __init__(self, api_key, quota=None, window=None, timeout=10, since=None, quota_path=None, clock=time.time):
+        count, per = parse_quota(quota or os.getenv('ALPHA_VANTAGE_QUOTA', DEFAULT_QUOTA))
+        self.api_key = api_key
+        self.limiter = TokenBucket(count, per, clock=clock, path=quota_path)
+        self.window = window if window is not None else per / count
+        # (connect, read) seconds
+        self.timeout = (3.05, timeout)
+        # Returns the `time_from` stamp, so only articles newer than those already seen are sent
+        self.since = since
+        self._clock = clock
+        self._session = None
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                # Keep-alive connections; one retry for dropped connections only
+                session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=1))
+                self._session = session
+            return self._session
+
+    def __call__(self, **params):
+        params = {'function': 'NEWS_SENTIMENT', 'sort': 'LATEST', 'limit': FEED_LIMIT, **params}
+        key = (tuple(sorted(params.items())), int(self._clock() // self.window) if self.window else None)
+        with self._lock:
+            if key in self._cache:
+                UPSTREAM_SKIPPED.inc(source='sentiment', reason='cached')
+                return self._cache[key]
+        if not self.limiter.try_acquire():
+            UPSTREAM_SKIPPED.inc(source='sentiment', reason='rate_limited')
+            return None
+        query = dict(params, apikey=self.api_key)
+        time_from = self.since() if self.since else None
+        if time_from:
+            query['time_from'] = time_from
+        with upstream_call('sentiment'):
+            response = self._get_session().get(ALPHA_VANTAGE_URL, params=query, timeout=self.timeout)
+            response.raise_for_status()
+            body = response.json()
+            # Quota and key errors come back as 200 with a note instead of a feed
+            if 'feed' not in body:
+                raise RuntimeError(body.get('Information') or body.get('Note') or body.get('Error Message') or 'No feed')
+        with self._lock:
+            # Only the current window can hit again
+            self._cache = {key: body}
+        return body
+
+
+class SentimentBook:
+    """Decay-weighted overall, per-ticker and per-topic sentiment, built incrementally from feed items.
+
+    Each aggregate is a (weighted score sum, weight sum) pair as of `as_of`; moving `as_of`
+    forward scales both by the same decay, so ingesting only touches the new articles.
+    The state, with the ids of recently seen articles, is saved to `path` after each ingest.
+    """
+    def __init__(self, path=None, half_life=SENTIMENT_HALF_LIFE, retention=SEEN_RETENTION, clock=time.time):
+        self.path = path
+        self.half_life = half_life
+        self.retention = retention
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.as_of = None
+        self.overall = [0.0, 0.0]
+        self.tickers = {}
+        self.topics = {}
+        self.seen = {}
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.as_of = state['as_of']
+        self.overall = state['overall']
+        self.tickers = state['tickers']
+        self.topics = state['topics']
+        self.seen = state['seen']
+
+    def _save(self):
+        if not self.path:
+            return
+        state = {'as_of': self.as_of, 'overall': self.overall, 'tickers': self.tickers,
+                 'topics': self.topics, 'seen': self.seen}
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+    def _decay_to(self, now):
+        if self.as_of is not None and now > self.as_of:
+            factor = 0.5 ** ((now - self.as_of) / self.half_life)
+            for pair in [self.overall, *self.tickers.values(), *self.topics.values()]:
+                pair[0] *= factor
+                pair[1] *= factor
+            for book in (self.tickers, self.topics):
+                for name in [n for n, pair in book.items() if pair[1] < MIN_WEIGHT]:
+                    del book[name]
+        self.as_of = max(now, self.as_of or now)
+
+    def ingest(self, feed):
+        """Fold the articles of `feed` not seen before into the aggregates; returns how many."""
+        with self._lock:
+            fresh = []
+            for item in feed:
+                article = item.get('url') or hashlib.sha1(json.dumps(item, sort_keys=True).encode('utf-8')).hexdigest()
+                published = _published(item.get('time_published'))
+                if article in self.seen or 'overall_sentiment_score' not in item:
+                    continue
+                fresh.append((article, published, item))
+            if not fresh:
+                return 0
+            now = self._clock()
+            self._decay_to(max([now] + [p for _, p, _ in fresh if p is not None]))
+            for article, published, item in fresh:
+                # Undated articles count as current
+                weight = 0.5 ** ((self.as_of - published) / self.half_life) if published is not None else 1.0
+                score = float(item['overall_sentiment_score'])
+                self.overall[0] += weight * score
+                self.overall[1] += weight
+                for entry in item.get('ticker_sentiment', []):
+                    w = weight * float(entry.get('relevance_score', 1))
+                    pair = self.tickers.setdefault(entry['ticker'], [0.0, 0.0])
+                    pair[0] += w * float(entry['ticker_sentiment_score'])
+                    pair[1] += w
+                for entry in item.get('topics', []):
+                    w = weight * float(entry.get('relevance_score', 1))
+                    pair = self.topics.setdefault(entry['topic'], [0.0, 0.0])
+                    pair[0] += w * score
+                    pair[1] += w
+                self.seen[article] = published if published is not None else self.as_of
+            horizon = self.as_of - self.retention
+            self.seen = {a: p for a, p in self.seen.items() if p >= horizon}
+            self._save()
+            return len(fresh)
+
+    def time_from(self):
+        """`time_from` stamp of the newest seen article, or None before the first ingest."""
+        with self._lock:
+            if not self.seen:
+                return None
+            latest = datetime.fromtimestamp(max(self.seen.values()), timezone.utc)
+        return latest.strftime('%Y%m%dT%H%M')
+
+    def summary(self, top=25):
+        """Overall score (None when empty), the `top` tickers by weight, every topic, and the article count."""
+        def scored(pairs):
+            return {name: {'score': s / w, 'weight': w} for name, (s, w) in pairs if w > 0}
+        with self._lock:
+            s, w = self.overall
+            tickers = sorted(self.tickers.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+            return {
+                'score': s / w if w > 0 else None,
+                'tickers': scored(tickers),
+                'topics': scored(sorted(self.topics.items())),
+                'articles': len(self.seen)
+            }
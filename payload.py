@@ -0,0 +1,143 @@
+import base64
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from deferred import DeferredModule
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+# Only compact_payload needs them
+np = DeferredModule('numpy')
+pd = DeferredModule('pandas')
+
+
+def _pack(values):
+    """Little-endian float32, base64-encoded. NaN survives, unlike in JSON numbers."""
+    return base64.b64encode(np.ascontiguousarray(values, dtype='<f4').tobytes()).decode('ascii')
+
+
+def select_fields(result, fields):
+    """Copy of `result` holding only `fields`; dotted names (`raw.fred`) select nested keys."""
+    selected = {}
+    for field in fields:
+        parent, _, child = field.rpartition('.')
+        source, target = result, selected
+        if parent:
+            source = result.get(parent, {})
+            target = selected.setdefault(parent, {})
+        if child in source:
+            target[child] = source[child]
+    return selected
+
+
+def filter_since(result, since):
+    """Copy of `result` whose momentum history only holds points dated after `since` (YYYY-MM-DD)."""
+    if not since or 'market' not in result.get('raw', {}):
+        return result
+    history = result['raw']['market']['momentum_history']
+    keep = [i for i, d in enumerate(history['dates']) if d > since]
+    trimmed = {
+        'dates': [history['dates'][i] for i in keep],
+        'series': {k: [v[i] for i in keep] for k, v in history['series'].items()}
+    }
+    market = {**result['raw']['market'], 'momentum_history': trimmed}
+    return {**result, 'raw': {**result['raw'], 'market': market}}
+
+
+def compact_payload(result, since=None):
+    """Columnar form of a regime snapshot.
+
+    The per-ticker momentum history becomes one float32 tickers x dates block and each
+    correlation dict-of-dicts (full-window and rolling) becomes the float32 upper triangle
+    (k=1, row-major) of its matrix over `columns.tickers`. Everything else is passed through.
+    """
+    market = result['raw']['market']
+    history = market['momentum_history']
+    dates = history['dates']
+    tickers = list(history['series'])
+    start = 0
+    if since:
+        start = int(np.searchsorted(np.array(dates, dtype=object), since, side='right')) if dates else 0
+    block = np.array([history['series'][t][start:] for t in tickers], dtype=np.float64).reshape(len(tickers), -1)
+
+    corr = pd.DataFrame(market['correlation'])
+    corr_tickers = list(corr.columns)
+    upper = np.triu_indices(len(corr_tickers), k=1)
+    pack_matrix = lambda m: _pack(pd.DataFrame(m).reindex(index=corr_tickers, columns=corr_tickers)
+                                  .to_numpy(dtype=np.float64)[upper])
+    packed = ('momentum_history', 'correlation', 'rolling_correlation')
+
+    return {
+        'composite': result['composite'],
+        'components': result['components'],
+        'summaries': result['summaries'],
+        'raw': {
+            'fred': result['raw']['fred'],
+            'sentiment': result['raw'].get('sentiment'),
+            'news': result['raw'].get('news'),
+            'market': {k: v for k, v in market.items() if k not in packed}
+        },
+        'columns': {
+            'history_tickers': tickers,
+            'dates': dates[start:],
+            'momentum_history': _pack(block),
+            'tickers': corr_tickers,
+            'correlation': pack_matrix(market['correlation']),
+            'rolling_correlation': {w: pack_matrix(m) for w, m in market.get('rolling_correlation', {}).items()}
+        }
+    }
+
+
+def choose_encoding(accept_encoding):
+    accepted = {e.split(';')[0].strip() for e in (accept_encoding or '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+class EncodedPayload:
+    """One serialized body plus its lazily computed compressed variants."""
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        if encoding is None:
+            return self.body
+        with self._lock:
+            if encoding not in self._encoded:
+                if encoding == 'br':
+                    self._encoded[encoding] = brotli.compress(self.body, quality=5)
+                else:
+                    self._encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+            return self._encoded[encoding]
+
+
+class PayloadCache:
+    """Encoded bodies per (snapshot, variant): N pollers of one snapshot cost a single encode."""
+    def __init__(self, size=32):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = EncodedPayload(json.dumps(build(), separators=(',', ':')).encode('utf-8'))
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime, timedelta
+from deferred import DeferredModule
+
+pd = DeferredModule('pandas')
+
+# Native publication frequency of every upstream input
+SERIES_FREQUENCY = {
+    'WALCL': 'weekly',
+    'WTGANN': 'weekly',
+    'NFCI': 'weekly',
+    'STLFSI4': 'weekly',
+    'CPIAUCSL': 'monthly',
+    'FEDFUNDS': 'monthly',
+    'DGS10': 'daily',
+    'T10Y3M': 'daily',
+    'T10YIE': 'daily',
+    'BAMLH0A0HYM2': 'daily',
+    'RRPONTSYD': 'daily',
+    'market': 'intraday'
+}
+
+# Days from an observation's date until FRED publishes it; backtests only see it from then on
+PUBLICATION_LAG = {
+    'WALCL': timedelta(days=1),       # H.4.1, Wednesday level released Thursday
+    'WTGANN': timedelta(days=1),      # H.4.1, week ending Wednesday
+    'NFCI': timedelta(days=5),        # Week ending Friday, released the next Wednesday
+    'STLFSI4': timedelta(days=6),     # Week ending Friday, released the next Thursday
+    'CPIAUCSL': timedelta(days=45),   # Dated the 1st, released mid the following month
+    'FEDFUNDS': timedelta(days=32),   # Monthly average dated the 1st, released the next month
+    'DGS10': timedelta(days=1),
+    'T10Y3M': timedelta(days=1),
+    'T10YIE': timedelta(days=1),
+    'BAMLH0A0HYM2': timedelta(days=1),
+    'RRPONTSYD': timedelta(days=1)
+}
+
+# Spacing between consecutive observations, as a pandas offset and its arguments; nothing
+# new can exist before last + step
+OBSERVATION_STEP = {
+    'daily': ('BDay', {'n': 1}),
+    'weekly': ('DateOffset', {'weeks': 1}),
+    'monthly': ('DateOffset', {'months': 1})
+}
+
+# Minimum gap between upstream checks once a new observation is possible (publication lag)
+POLL_INTERVAL = {
+    'intraday': timedelta(0),
+    'daily': timedelta(hours=1),
+    'weekly': timedelta(hours=6),
+    'monthly': timedelta(hours=12)
+}
+
+
+class RefreshSchedule:
+    """Decides, per input, whether an upstream poll can possibly return new data."""
+    def __init__(self, frequencies=None, clock=datetime.now):
+        self.frequencies = frequencies or SERIES_FREQUENCY
+        self.clock = clock
+        self._checked = {}
+        self._updated = {}
+        self._lock = threading.Lock()
+
+    def frequency(self, key):
+        return self.frequencies.get(key, 'daily')
+
+    def next_observation(self, key, last_observation):
+        """Earliest date the next observation can carry, or None if unknown."""
+        step = OBSERVATION_STEP.get(self.frequency(key))
+        if step is None or last_observation is None:
+            return None
+        offset, kwargs = step
+        return pd.Timestamp(last_observation) + getattr(pd.offsets, offset)(**kwargs)
+
+    def due(self, key, last_observation=None):
+        now = self.clock()
+        freq = self.frequency(key)
+        with self._lock:
+            checked = self._checked.get(key)
+        if checked is None:
+            return True
+        if now - checked < POLL_INTERVAL[freq]:
+            return False
+        if freq == 'intraday':
+            # Markets are shut at the weekend; one poll after the close is enough
+            return now.weekday() < 5 or checked.weekday() < 5
+        nxt = self.next_observation(key, last_observation)
+        return nxt is None or pd.Timestamp(now) >= nxt
+
+    def mark_checked(self, key, last_updated=None):
+        with self._lock:
+            self._checked[key] = self.clock()
+            if last_updated is not None:
+                self._updated[key] = last_updated
+
+    def last_updated(self, key):
+        """Upstream `last_updated` stamp recorded at the previous check, if any."""
+        with self._lock:
+            return self._updated.get(key)
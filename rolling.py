@@ -0,0 +1,213 @@
+from deferred import DeferredModule
+
+np = DeferredModule('numpy')
+
+TRADING_DAYS = 252
+# Horizons (in bars) computed together by horizon_stats
+MOMENTUM_HORIZONS = (5, 21, 63, 126)
+CORRELATION_WINDOWS = (20, 60)
+EWMA_DECAY = 0.94  # RiskMetrics daily decay
+
+
+class RollingWindow:
+    """Correlation, volatility and momentum over the last `capacity` bars, updated per tick.
+
+    Bars live in a ring buffer next to running sums of prices, price cross-products and daily
+    returns, so appending a bar or revising the latest one costs O(assets²) however long the
+    window is. Price sums are kept relative to a reference bar to limit cancellation, and every
+    `capacity` updates they are rebuilt from the buffer so rounding drift cannot accumulate.
+    Statistics match the batch definitions in MacroEngine: Pearson correlation of price levels,
+    sample std of simple returns annualized in percent, and `lag`-bar simple momentum.
+    """
+    def __init__(self, columns, capacity, lag=21):
+        self.columns = list(columns)
+        self.positions = {c: i for i, c in enumerate(self.columns)}
+        self.capacity = capacity
+        self.lag = lag
+        n = len(self.columns)
+        self._prices = np.empty((capacity, n))
+        self._dates = [None] * capacity
+        self._start = 0
+        self._count = 0
+        self._updates = 0
+        self._ref = np.zeros(n)
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._ret_sum = np.zeros(n)
+        self._ret_sq = np.zeros(n)
+
+    @classmethod
+    def from_frame(cls, df, lag=21, capacity=None):
+        """Seed from a gap-free close panel (dates x tickers), keeping its length as the window."""
+        window = cls(df.columns, capacity or len(df), lag)
+        bars = df.to_numpy(dtype=np.float64)[-window.capacity:]
+        window._prices[:len(bars)] = bars
+        window._dates[:len(bars)] = list(df.index[-window.capacity:])
+        window._count = len(bars)
+        window._rebuild()
+        return window
+
+    def copy(self):
+        other = RollingWindow(self.columns, self.capacity, self.lag)
+        for name in ('_prices', '_ref', '_sum', '_cross', '_ret_sum', '_ret_sq'):
+            setattr(other, name, getattr(self, name).copy())
+        other._dates = list(self._dates)
+        other._start, other._count, other._updates = self._start, self._count, self._updates
+        return other
+
+    def __len__(self):
+        return self._count
+
+    def _pos(self, k):
+        """Ring position of the k-th bar, oldest first; negative k counts from the latest."""
+        return (self._start + (k % self._count)) % self.capacity
+
+    def bars(self):
+        return self._prices[(self._start + np.arange(self._count)) % self.capacity]
+
+    @property
+    def last_date(self):
+        return self._dates[self._pos(-1)] if self._count else None
+
+    def _rebuild(self):
+        bars = self.bars()
+        self._ref = bars[0].copy()
+        x = bars - self._ref
+        self._sum = x.sum(axis=0)
+        self._cross = x.T @ x
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = bars[1:] / bars[:-1] - 1
+        self._ret_sum = r.sum(axis=0)
+        self._ret_sq = (r * r).sum(axis=0)
+        self._updates = 0
+
+    def _row(self, prices):
+        """Dense price row from an array or a {ticker: price} dict; missing prices carry forward."""
+        last = self._prices[self._pos(-1)] if self._count else np.full(len(self.columns), np.nan)
+        if isinstance(prices, dict):
+            row = last.copy()
+            for ticker, price in prices.items():
+                i = self.positions.get(ticker)
+                if i is not None and np.isfinite(price):
+                    row[i] = price
+            return row
+        prices = np.asarray(prices, dtype=np.float64)
+        return np.where(np.isfinite(prices), prices, last)
+
+    def _add_bar(self, x, sign):
+        d = x - self._ref
+        self._sum += sign * d
+        self._cross += sign * np.outer(d, d)
+
+    def _add_return(self, prev, x, sign):
+        r = x / prev - 1
+        self._ret_sum += sign * r
+        self._ret_sq += sign * r * r
+
+    def push(self, prices, date=None):
+        """Append a new bar, evicting the oldest once the window is full."""
+        x = self._row(prices)
+        if self._count == self.capacity:
+            oldest = self._prices[self._pos(0)].copy()
+            self._add_bar(oldest, -1)
+            if self._count > 1:
+                self._add_return(oldest, self._prices[self._pos(1)], -1)
+            self._start = (self._start + 1) % self.capacity
+            self._count -= 1
+        if self._count:
+            self._add_return(self._prices[self._pos(-1)], x, 1)
+        pos = (self._start + self._count) % self.capacity
+        self._prices[pos] = x
+        self._dates[pos] = date
+        self._count += 1
+        self._add_bar(x, 1)
+        self._tick()
+
+    def revise(self, prices):
+        """Replace the latest bar, e.g. with a live quote for the session in progress."""
+        pos = self._pos(-1)
+        old = self._prices[pos].copy()
+        x = self._row(prices)
+        self._add_bar(old, -1)
+        self._add_bar(x, 1)
+        if self._count > 1:
+            prev = self._prices[self._pos(-2)]
+            self._add_return(prev, old, -1)
+            self._add_return(prev, x, 1)
+        self._prices[pos] = x
+        self._tick()
+
+    def _tick(self):
+        self._updates += 1
+        if self._updates >= self.capacity:
+            self._rebuild()
+
+    def latest(self, ticker):
+        return self._prices[self._pos(-1), self.positions[ticker]]
+
+    def momentum(self):
+        """`lag`-bar simple return per column (NaN until the window holds lag + 1 bars)."""
+        if self._count <= self.lag:
+            return np.full(len(self.columns), np.nan)
+        return self._prices[self._pos(-1)] / self._prices[self._pos(-1 - self.lag)] - 1
+
+    def ratio(self, a, b):
+        """(latest a/b, its `lag`-bar change)."""
+        i, j = self.positions[a], self.positions[b]
+        now = self._prices[self._pos(-1)]
+        latest = now[i] / now[j]
+        if self._count <= self.lag:
+            return latest, np.nan
+        then = self._prices[self._pos(-1 - self.lag)]
+        return latest, latest / (then[i] / then[j]) - 1
+
+    def correlation(self):
+        cov = self._cross - np.outer(self._sum, self._sum) / self._count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sd = np.sqrt(np.diag(cov))
+            corr = cov / np.outer(sd, sd)
+        return np.clip(corr, -1, 1)
+
+    def volatility(self):
+        """Annualized volatility of daily returns, in percent."""
+        m = self._count - 1
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (self._ret_sq - self._ret_sum ** 2 / m) / (m - 1)
+        return np.sqrt(np.maximum(var, 0)) * np.sqrt(TRADING_DAYS) * 100
+
+
+def horizon_stats(prices, horizons=MOMENTUM_HORIZONS, windows=CORRELATION_WINDOWS, decay=EWMA_DECAY):
+    """Multi-horizon momentum, rolling return correlations and EWMA volatility in one pass.
+
+    `prices` is an aligned, gap-free (bars x assets) array. Daily returns are taken once and the
+    correlation windows are nested suffixes of them, so each longer window extends the shorter
+    one's cross-product sums with its extra rows instead of starting over. Horizons or windows
+    longer than the data come back as NaN.
+    """
+    p = np.asarray(prices, dtype=np.float64)
+    n = p.shape[1]
+    returns = p[1:] / p[:-1] - 1
+    m = len(returns)
+
+    momentum = {h: p[-1] / p[-1 - h] - 1 if len(p) > h else np.full(n, np.nan) for h in horizons}
+
+    correlation = {}
+    cross, total, covered = np.zeros((n, n)), np.zeros(n), 0
+    for w in sorted(windows):
+        if w > m or w < 2:
+            correlation[w] = np.full((n, n), np.nan)
+            continue
+        block = returns[m - w:m - covered]
+        cross += block.T @ block
+        total += block.sum(axis=0)
+        covered = w
+        cov = (cross - np.outer(total, total) / w) / (w - 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sd = np.sqrt(np.diag(cov))
+            correlation[w] = np.clip(cov / np.outer(sd, sd), -1, 1)
+
+    # Zero-mean EWMA variance, newest return weighted highest
+    weights = decay ** np.arange(m)[::-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ewma_vol = np.sqrt(weights @ returns ** 2 / weights.sum()) * np.sqrt(TRADING_DAYS) * 100
+    return {'momentum': momentum, 'correlation': correlation, 'ewma_vol': ewma_vol}
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+from deferred import DeferredModule
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: only threads of one process are kept apart
+    fcntl = None
+
+pd = DeferredModule('pandas')
+np = DeferredModule('numpy')
+
+DEFAULT_STORE_DIR = os.path.join(tempfile.gettempdir(), 'macro_compass', 'series')
+
+
+class SeriesStore:
+    """Columnar on-disk store for upstream time series, keyed by series ID.
+
+    Each series is kept as two raw binary columns: `<key>.dates` (int64 epoch-ns)
+    and `<key>.values` (float64). Reads are memory-mapped and writes only touch
+    the tail of the files, so a refresh costs O(new observations).
+
+    Several processes may share one root: reads hold a shared flock on `<root>/.lock` and
+    writes an exclusive one, so no process maps a column another is truncating.
+    """
+    def __init__(self, root=None):
+        self.root = root or os.getenv('SERIES_STORE_DIR', DEFAULT_STORE_DIR)
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(self.root, '.lock')
+        self._lock_file = None
+        self._lock_pid = None
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            # Opened per process: a descriptor inherited across fork would share its lock
+            if self._lock_file is None or self._lock_pid != os.getpid():
+                self._lock_file = open(self._lock_path, 'a')
+                self._lock_pid = os.getpid()
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _paths(self, key):
+        base = os.path.join(self.root, quote(key, safe=''))
+        return base + '.dates', base + '.values'
+
+    def _map(self, path, dtype):
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    def _columns(self, key):
+        dates_path, values_path = self._paths(key)
+        dates = self._map(dates_path, np.int64)
+        values = self._map(values_path, np.float64)
+        # A write interrupted between the two columns leaves them uneven; trust the shorter one
+        n = min(len(dates), len(values))
+        return dates[:n], values[:n]
+
+    def keys(self):
+        return sorted(unquote(f[:-len('.dates')]) for f in os.listdir(self.root) if f.endswith('.dates'))
+
+    def last_date(self, key):
+        """Date of the newest stored observation, or None if the series is not stored."""
+        with self._locked():
+            dates, _ = self._columns(key)
+            return pd.Timestamp(int(dates[-1])) if len(dates) else None
+
+    def read(self, key, start=None):
+        """Return the stored series (optionally from `start` onward) as a pandas Series."""
+        with self._locked():
+            dates, values = self._columns(key)
+            lo = np.searchsorted(dates, pd.Timestamp(start).value) if start is not None and len(dates) else 0
+            index = pd.DatetimeIndex(np.array(dates[lo:]).view('datetime64[ns]'))
+            return pd.Series(np.array(values[lo:]), index=index, name=key)
+
+    def upsert(self, key, series):
+        """Write observations, replacing any stored ones from the first new date onward.
+
+        Re-sending the last stored observation (e.g. an intraday bar that is still
+        moving, or a revised print) overwrites it instead of duplicating it.
+        """
+        series = series.dropna()
+        if series.empty:
+            return 0
+        index = pd.DatetimeIndex(series.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        new_dates = index.as_unit('ns').asi8
+        order = np.argsort(new_dates, kind='stable')
+        new_dates = new_dates[order]
+        new_values = series.to_numpy(dtype=np.float64)[order]
+
+        with self._locked(exclusive=True):
+            dates_path, values_path = self._paths(key)
+            dates, values = self._columns(key)
+            keep = int(np.searchsorted(dates, new_dates[0]))
+            del dates, values
+            for path, column in ((dates_path, new_dates), (values_path, new_values)):
+                with open(path, 'ab') as f:
+                    f.truncate(keep * 8)
+                    f.write(np.ascontiguousarray(column).tobytes())
+        return len(new_dates)
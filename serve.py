@@ -0,0 +1,25 @@
+"""Serving entry point for long-lived connections.
+
+Runs the app under gevent's WSGI server when gevent is installed, so every idle
+/api/macro/stream client costs a greenlet instead of an OS thread, and keeps the
+engine's snapshot refreshed in the background so updates are pushed as they land.
+"""
+try:
+    from gevent import monkey
+    monkey.patch_all()
+    from gevent.pywsgi import WSGIServer
+except ImportError:
+    WSGIServer = None
+
+import os
+from app import app, engine
+
+if __name__ == "__main__":
+    port = int(os.getenv('PORT', 3000))
+    engine.start_background_refresh()
+    if WSGIServer is None:
+        print("gevent not installed (pip install gevent); using the threaded Werkzeug server")
+        app.run(host='0.0.0.0', port=port, threaded=True)
+    else:
+        print(f"🔥 Global Macro Compass Server (gevent) running at http://localhost:{port}")
+        WSGIServer(('0.0.0.0', port), app, log=None).serve_forever()
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import zlib
+from datetime import date, datetime, time
+
+DEFAULT_ARCHIVE_PATH = os.path.join(tempfile.gettempdir(), 'macro_compass', 'snapshots.sqlite3')
+
+# Most rows a range query returns (the newest ones when there are more)
+RANGE_LIMIT = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    computed_at TEXT NOT NULL,
+    composite REAL,
+    components TEXT,
+    digest BLOB NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_computed_at ON snapshots (computed_at);
+"""
+
+
+def _bound(value, end=True):
+    """`value` (a date or ISO timestamp) in the stored computed_at form, so strings compare as times.
+
+    A bare date stands for the end of that day (`end`) or its start. Aware timestamps are
+    converted to local time, which computed_at is recorded in. Raises ValueError otherwise.
+    """
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is not None:
+            moment = moment.astimezone().replace(tzinfo=None)
+        return moment.isoformat()
+    return datetime.combine(day, time.max if end else time.min).isoformat()
+
+
+class SnapshotArchive:
+    """Append-only SQLite log of every published regime snapshot, indexed by computed_at.
+
+    Each row keeps the zlib-compressed JSON body for point-in-time reads plus the composite
+    and components as plain columns, so range queries never decompress a body. A snapshot
+    identical to the previous one is not stored again.
+    """
+    def __init__(self, path=None):
+        self.path = path or os.getenv('SNAPSHOT_ARCHIVE', DEFAULT_ARCHIVE_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # WAL lets other worker processes read while the producer appends
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+        self._last_digest = None
+
+    def append(self, result, computed_at):
+        """Archive one snapshot; fits MacroEngine.subscribe."""
+        body = json.dumps(result, separators=(',', ':'), default=float).encode('utf-8')
+        digest = hashlib.sha1(body).digest()
+        with self._lock:
+            if self._last_digest is None:
+                row = self._db.execute('SELECT digest FROM snapshots ORDER BY id DESC LIMIT 1').fetchone()
+                self._last_digest = row[0] if row else b''
+            if digest == self._last_digest:
+                return False
+            self._db.execute(
+                'INSERT INTO snapshots (computed_at, composite, components, digest, body) VALUES (?, ?, ?, ?, ?)',
+                (computed_at, result.get('composite'), json.dumps(result.get('components')),
+                 digest, zlib.compress(body, 6))
+            )
+            self._last_digest = digest
+        return True
+
+    def asof(self, asof):
+        """(result, computed_at) of the last snapshot computed on or before `asof`, or None.
+
+        `asof` is a date (meaning the end of that day) or an ISO timestamp.
+        """
+        bound = _bound(asof)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT body, computed_at FROM snapshots WHERE computed_at <= ? ORDER BY computed_at DESC, id DESC LIMIT 1',
+                (bound,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0])), row[1]
+
+    def latest(self):
+        """(result, computed_at) of the most recently archived snapshot, or None."""
+        with self._lock:
+            row = self._db.execute('SELECT body, computed_at FROM snapshots ORDER BY id DESC LIMIT 1').fetchone()
+        return (json.loads(zlib.decompress(row[0])), row[1]) if row else None
+
+    def range(self, start=None, end=None, limit=RANGE_LIMIT):
+        """Composite and components of the snapshots between `start` and `end` (inclusive), oldest first.
+
+        At most `limit` rows, the newest ones in the range.
+        """
+        lower = _bound(start, end=False) if start else ''
+        upper = _bound(end) if end else '9999'
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT computed_at, composite, components FROM snapshots '
+                'WHERE computed_at >= ? AND computed_at <= ? ORDER BY computed_at DESC, id DESC LIMIT ?',
+                (lower, upper, limit)
+            ).fetchall()
+        return [(computed_at, composite, json.loads(components)) for computed_at, composite, components in reversed(rows)]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
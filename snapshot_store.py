@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from payload import select_fields
+from stream import apply_patch
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: every process acts as its own producer
+    fcntl = None
+
+
+class SharedSnapshot:
+    """Latest regime snapshot shared by every worker process through one file.
+
+    Exactly one process (whoever holds an flock on `<path>.lock`) runs the engine and
+    publishes each snapshot by writing a temp file and os.replace-ing it over `path`, so
+    readers always see a complete snapshot. The others only stat the file and re-parse it
+    when it changes. If the producer dies its lock is released and another worker takes over.
+    Quote ticks are patched into the producer's copy and written at most once per `poll`.
+    """
+    def __init__(self, path, ttl=300, poll=1.0):
+        self.path = path
+        self.ttl = ttl
+        self.poll = poll
+        self.is_producer = False
+        self._lock_file = None
+        self._stat = None
+        self._snapshot = None
+        self._computed_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._listener = None
+        # Producer only: last snapshot it wrote, and one patched by quote ticks still to be written
+        self._written = None
+        self._pending = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def write(self, result, computed_at):
+        with self._lock:
+            self._written = result
+            self._pending = None
+        self._write(result, computed_at)
+
+    def _quote_tick(self, update, computed_at):
+        with self._lock:
+            if self._written is None:
+                return
+            self._written = apply_patch(self._written, update)
+            self._pending = (self._written, computed_at)
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            self._write(*pending)
+
+    def _write(self, result, computed_at):
+        body = json.dumps({'computed_at': computed_at, 'result': result}, separators=(',', ':'), default=float)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), prefix='.snapshot-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(body)
+            os.replace(tmp, self.path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _load(self):
+        """Re-read the file if it was swapped since the last look. Returns True when it changed."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key == self._stat:
+            return False
+        with open(self.path) as f:
+            data = json.load(f)
+        with self._lock:
+            if key == self._stat:  # another thread loaded it meanwhile
+                return False
+            self._stat = key
+            self._snapshot = data['result']
+            self._computed_at = data['computed_at']
+        # Notify from here: a request thread's get_snapshot may be the one that sees the swap
+        if self._listener:
+            try:
+                self._listener(data['result'], data['computed_at'])
+            except Exception:
+                pass
+        return True
+
+    def get_snapshot(self, wait=30):
+        """(result, meta) like MacroEngine.get_snapshot, waiting up to `wait`s for the first publish."""
+        deadline = time.monotonic() + wait
+        self._load()
+        while self._snapshot is None:
+            if time.monotonic() >= deadline:
+                raise TimeoutError("No snapshot has been published yet")
+            time.sleep(0.1)
+            self._load()
+        with self._lock:
+            result, computed_at = self._snapshot, self._computed_at
+        age = (datetime.now() - datetime.fromisoformat(computed_at)).total_seconds()
+        return result, {
+            'computed_at': computed_at,
+            'age_seconds': age,
+            'ttl_seconds': self.ttl,
+            'stale': age >= self.ttl,
+            'refreshing': False
+        }
+
+    def get_fields(self, fields, wait=30):
+        """Like MacroEngine.get_fields, projected from the shared full snapshot."""
+        result, meta = self.get_snapshot(wait)
+        return select_fields(result, fields), meta
+
+    def _try_become_producer(self):
+        if fcntl is None:
+            return True
+        f = open(self.path + '.lock', 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f  # held for the life of the process
+        return True
+
+    def start(self, engine, listener=None):
+        """Elect a producer and watch the file; `listener(result, computed_at)` fires on every swap."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._listener = listener
+        self._thread = threading.Thread(target=self._run, args=(engine,),
+                                        name='snapshot-watch', daemon=True)
+        self._thread.start()
+
+    def _run(self, engine):
+        while True:
+            if not self.is_producer and self._try_become_producer():
+                self.is_producer = True
+                engine.subscribe(self.write)
+                engine.subscribe_quotes(self._quote_tick)
+                engine.start_background_refresh()
+            try:
+                self._flush()
+                self._load()
+            except Exception:
+                pass
+            time.sleep(self.poll)
@@ -0,0 +1,137 @@
+import json
+import math
+import threading
+
+_SAME = object()
+
+
+def _equal(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a is b or a == b
+
+
+def merge_patch(old, new):
+    """RFC 7386 JSON merge patch turning `old` into `new`; `_SAME` when nothing changed.
+
+    Dicts are diffed key by key, anything else (numbers, strings, lists) is replaced whole.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch = {}
+        for key, value in new.items():
+            sub = merge_patch(old[key], value) if key in old else value
+            if sub is not _SAME:
+                patch[key] = sub
+        for key in old:
+            if key not in new:
+                patch[key] = None
+        return patch if patch else _SAME
+    return _SAME if _equal(old, new) else new
+
+
+def apply_patch(target, patch):
+    """`target` with merge `patch` applied; only the dicts along the patch are copied."""
+    if not isinstance(patch, dict) or not isinstance(target, dict):
+        return patch
+    result = dict(target)
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_patch(target.get(key), value)
+    return result
+
+
+def _event(name, version, data):
+    body = json.dumps(data, separators=(',', ':'), default=float)
+    return f"id: {version}\nevent: {name}\ndata: {body}\n\n".encode('utf-8')
+
+
+class SnapshotBroadcaster:
+    """Fans each new regime snapshot out to every connected SSE client.
+
+    Events are encoded once per snapshot in `publish` and the same bytes are yielded to all
+    subscribers, so N clients cost N socket writes rather than N serializations. Clients that
+    saw the previous snapshot get a merge-patch `delta`; anyone further behind gets a full `snapshot`.
+    Quote ticks arrive as patches already (`publish_patch`), and their full event is only encoded
+    if a client that fell behind asks for it. Publishers are serialized, so a tick landing during a
+    refresh gets the next version and patches the refreshed snapshot.
+    """
+    def __init__(self, heartbeat=15):
+        self.heartbeat = heartbeat
+        self._cond = threading.Condition()
+        # Held across a whole publish: encoding happens outside _cond so streams are not held up
+        self._publishing = threading.Lock()
+        self._version = 0
+        self._snapshot = None
+        self._meta = None
+        self._full = None
+        self._delta = None
+        self.subscribers = 0
+
+    def publish(self, result, computed_at=None):
+        meta = {'computed_at': computed_at}
+        with self._publishing:
+            previous, version = self._snapshot, self._version + 1
+            full = _event('snapshot', version, {**result, 'meta': meta})
+            delta = None
+            if previous is not None:
+                patch = merge_patch(previous, result)
+                delta = _event('delta', version, {**(patch if patch is not _SAME else {}), 'meta': meta})
+            with self._cond:
+                self._version = version
+                self._snapshot = result
+                self._meta = meta
+                self._full = full
+                self._delta = delta
+                self._cond.notify_all()
+
+    def publish_patch(self, patch, computed_at=None):
+        """Send a partial update (an apply_quotes tick) as a `delta` without encoding the full snapshot."""
+        meta = {'computed_at': computed_at}
+        with self._publishing:
+            previous, version = self._snapshot, self._version + 1
+            if previous is None:
+                return  # nothing to patch yet; clients get the next full snapshot
+            delta = _event('delta', version, {**patch, 'meta': meta})
+            snapshot = apply_patch(previous, patch)
+            with self._cond:
+                self._version = version
+                self._snapshot = snapshot
+                self._meta = meta
+                self._full = None
+                self._delta = delta
+                self._cond.notify_all()
+
+    def _full_event(self):
+        """The current full `snapshot` event, encoded on first use after a patch. Call holding _cond."""
+        if self._full is None:
+            self._full = _event('snapshot', self._version, {**self._snapshot, 'meta': self._meta})
+        return self._full
+
+    def stream(self, last_event_id=None):
+        """Generator of SSE frames for one client; pass the Last-Event-ID header to resume."""
+        seen = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+        with self._cond:
+            self.subscribers += 1
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                with self._cond:
+                    if seen > self._version:
+                        # Resuming against a restarted server: versions started over
+                        seen = 0
+                    self._cond.wait_for(lambda: self._version > seen, timeout=self.heartbeat)
+                    version, delta = self._version, self._delta
+                    if version > seen and (delta is None or version != seen + 1):
+                        frame = self._full_event()
+                    else:
+                        frame = delta
+                if version <= seen:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield frame
+                seen = version
+        finally:
+            with self._cond:
+                self.subscribers -= 1
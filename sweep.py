@@ -0,0 +1,118 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from data_engine import COMPONENTS, DEFAULT_PARAMS, RegimeParams, component_inputs, history_inputs
+
+# Composite band treated as "no call" (the dashboard's TRANSITION label)
+NEUTRAL_BAND = 0.1
+
+# Worker-side views onto the parent's shared-memory arrays, set by _attach
+_shared = {}
+
+
+def sweep_inputs(fred_series, closes, sentiment=0.15, horizon=21, benchmark='SPY', params=DEFAULT_PARAMS):
+    """Signed raw inputs (T x 6, COMPONENTS order) and the benchmark's forward return over `horizon` sessions."""
+    inputs = history_inputs(fred_series, closes, sentiment)
+    signed = np.column_stack(component_inputs(*(inputs[c].to_numpy() for c in inputs.columns), params=params))
+    prices = closes[benchmark].ffill().bfill().to_numpy()
+    forward = np.full(len(prices), np.nan)
+    forward[:-horizon] = prices[horizon:] / prices[:-horizon] - 1
+    valid = ~np.isnan(signed).any(axis=1) & ~np.isnan(forward)
+    return np.ascontiguousarray(signed[valid]), forward[valid]
+
+
+def param_grid(weights, divisors):
+    """Every combination of per-component candidates, e.g. weights={'Credit': [0.1, 0.2, 0.3]}.
+
+    Components that are not listed keep their default. Weights are renormalized to sum to 1.
+    """
+    weight_choices = [weights.get(c, [w]) for c, w in zip(COMPONENTS, DEFAULT_PARAMS.weights)]
+    divisor_choices = [divisors.get(c, [d]) for c, d in zip(COMPONENTS, DEFAULT_PARAMS.divisors)]
+    configs = []
+    for w in itertools.product(*weight_choices):
+        total = sum(w)
+        if total <= 0:
+            continue
+        for d in itertools.product(*divisor_choices):
+            configs.append(RegimeParams(weights=tuple(x / total for x in w), divisors=tuple(d)))
+    return configs
+
+
+def regime_stats(signed, forward, weights, divisors):
+    """Hit statistics for a batch of K configurations at once. weights/divisors are K x 6."""
+    composite = np.clip(np.clip(signed[None, :, :] / divisors[:, None, :], -1, 1) @ weights[:, :, None], -1, 1)[:, :, 0]
+    bullish = composite > NEUTRAL_BAND
+    bearish = composite < -NEUTRAL_BAND
+    called = bullish | bearish
+    hits = (bullish & (forward > 0)) | (bearish & (forward < 0))
+    n_called = called.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'hit_rate': hits.sum(axis=1) / n_called,
+            'coverage': n_called / composite.shape[1],
+            'bullish_share': bullish.mean(axis=1),
+            'bearish_share': bearish.mean(axis=1),
+            'fwd_return_bullish': (forward * bullish).sum(axis=1) / bullish.sum(axis=1),
+            'fwd_return_bearish': (forward * bearish).sum(axis=1) / bearish.sum(axis=1),
+            'switches': (np.diff(np.sign(composite) * called, axis=1) != 0).sum(axis=1),
+            'mean_composite': composite.mean(axis=1)
+        }
+
+
+def _attach(specs):
+    for key, (name, shape) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _shared[key] = (shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+
+
+def _run_chunk(weights, divisors):
+    return regime_stats(_shared['signed'][1], _shared['forward'][1], weights, divisors)
+
+
+def run_sweep(signed, forward, configs, processes=None, chunk_size=128):
+    """Evaluate every configuration across a process pool and return one row of stats per config.
+
+    The input arrays are placed in shared memory once; workers map them instead of receiving a
+    pickled copy per task, so only the small weight/divisor chunks cross process boundaries.
+    """
+    weights = np.array([c.weights for c in configs], dtype=np.float64)
+    divisors = np.array([c.divisors for c in configs], dtype=np.float64)
+    blocks = {}
+    try:
+        for key, arr in (('signed', signed), ('forward', forward)):
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=np.float64, buffer=shm.buf)[:] = arr
+            blocks[key] = (shm, arr.shape)
+        specs = {key: (shm.name, shape) for key, (shm, shape) in blocks.items()}
+        chunks = range(0, len(configs), chunk_size)
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=_attach, initargs=(specs,)) as pool:
+            results = list(pool.map(_run_chunk, (weights[i:i + chunk_size] for i in chunks),
+                                    (divisors[i:i + chunk_size] for i in chunks)))
+    finally:
+        for shm, _ in blocks.values():
+            shm.close()
+            shm.unlink()
+
+    stats = pd.DataFrame({k: np.concatenate([r[k] for r in results]) for k in results[0]}) if results else pd.DataFrame()
+    for i, name in enumerate(COMPONENTS):
+        stats.insert(i, f'w_{name}', weights[:, i])
+    for i, name in enumerate(COMPONENTS):
+        stats.insert(len(COMPONENTS) + i, f'd_{name}', divisors[:, i])
+    return stats
+
+
+if __name__ == "__main__":
+    from data_engine import MacroEngine
+    engine = MacroEngine()
+    fred, closes = engine.history_data(pd.Timestamp.now().normalize() - pd.DateOffset(years=10))
+    signed, forward = sweep_inputs(fred, closes)
+    configs = param_grid(
+        weights={c: [0.05, 0.15, 0.25] for c in COMPONENTS},
+        divisors={'Growth': [0.05, 0.10, 0.15], 'Appetite': [0.05, 0.10, 0.15], 'Monetary': [0.5, 0.8]}
+    )
+    print(f"Sweeping {len(configs)} configurations over {len(forward)} sessions...")
+    stats = run_sweep(signed, forward, configs)
+    print(stats.sort_values('hit_rate', ascending=False).head(10).to_string())
@@ -0,0 +1,85 @@
+from datetime import date
+import pytest
+from fakes import SlowFred, offline_engine
+from snapshot_archive import SnapshotArchive
+
+
+def snapshot(composite):
+    return {'composite': composite, 'components': {'Liquidity': composite / 2}, 'raw': {'fred': {'nfci': -0.5}}}
+
+
+def test_asof_returns_last_snapshot_of_the_day(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / 'archive.sqlite3'))
+    archive.append(snapshot(0.1), '2024-06-27T16:00:00')
+    archive.append(snapshot(0.2), '2024-06-28T09:00:00')
+    archive.append(snapshot(0.3), '2024-06-28T17:30:00')
+    assert archive.asof('2024-06-28') == (snapshot(0.3), '2024-06-28T17:30:00')
+    assert archive.asof('2024-06-28T12:00:00')[1] == '2024-06-28T09:00:00'
+    assert archive.asof('2024-06-26') is None
+    # Other ISO spellings compare as times, not as strings
+    assert archive.asof('2024-06-28 12:00')[1] == '2024-06-28T09:00:00'
+    assert archive.asof('20240628')[1] == '2024-06-28T17:30:00'
+    assert archive.asof('2024-06-28T09:00')[1] == '2024-06-28T09:00:00'
+    with pytest.raises(ValueError):
+        archive.asof('yesterday')
+    # Survives a reopen
+    assert len(SnapshotArchive(archive.path)) == 3
+
+
+def test_identical_snapshots_are_stored_once(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / 'archive.sqlite3'))
+    assert archive.append(snapshot(0.1), '2024-06-28T09:00:00')
+    assert not archive.append(snapshot(0.1), '2024-06-28T09:05:00')
+    assert not SnapshotArchive(archive.path).append(snapshot(0.1), '2024-06-28T09:10:00')
+    assert len(archive) == 1
+
+
+def test_range_reads_light_columns(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / 'archive.sqlite3'))
+    for day, composite in [('2024-06-26', 0.1), ('2024-06-27', 0.2), ('2024-06-28', 0.3)]:
+        archive.append(snapshot(composite), f'{day}T16:00:00')
+    rows = archive.range('2024-06-27', '2024-06-28')
+    assert [r[1] for r in rows] == [0.2, 0.3]
+    assert rows[0][2] == {'Liquidity': 0.1}
+    assert len(archive.range()) == 3
+    assert [r[1] for r in archive.range('20240627', limit=1)] == [0.3]
+
+
+def test_asof_endpoint(client):
+    live = client.get('/api/macro').get_json()
+    today = date.today().isoformat()
+    archived = client.get(f'/api/macro?asof={today}').get_json()
+    assert archived['composite'] == live['composite']
+    assert archived['meta']['asof'] == today
+    partial = client.get(f'/api/macro?asof={today}&fields=composite').get_json()
+    assert set(partial) == {'composite', 'meta'}
+    assert client.get('/api/macro?asof=2000-01-01').status_code == 404
+    assert client.get('/api/macro?asof=yesterday').status_code == 400
+
+    series = client.get('/api/macro/archive').get_json()
+    assert series['composite'] == [live['composite']]
+    assert not series['truncated']
+    assert client.get('/api/macro/archive?limit=0').status_code == 400
+    assert client.get('/api/macro/archive?start=soon').status_code == 400
+    assert set(series['components']) == set(live['components'])
+
+
+def test_primed_engine_serves_archived_snapshot_then_refreshes(tmp_path):
+    engine = offline_engine(SlowFred(delay=0.2), tmp_path)
+    engine.prime(snapshot(0.4), '2024-06-28T16:00:00')
+    assert engine.calculate_regime() == snapshot(0.4)
+    assert engine.snapshot_meta()['stale']
+    assert engine.get_fields(['composite'])[0] == {'composite': 0.4}
+    # The stale primed snapshot triggered a background refresh
+    assert engine.refresh().result()['composite'] != 0.4
+
+
+def test_quote_ticks_are_not_archived(tmp_path):
+    engine = offline_engine(SlowFred(delay=0), tmp_path)
+    archive = SnapshotArchive(str(tmp_path / 'archive.sqlite3'))
+    engine.subscribe(archive.append)
+    engine.calculate_regime()
+    spy = engine._window.latest('SPY')
+    for move in (1.01, 1.02, 1.03):
+        engine.apply_quotes({'SPY': spy * move})
+    assert len(archive) == 1
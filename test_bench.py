@@ -0,0 +1,24 @@
+import bench
+
+
+def test_benchmark_runs_offline_and_compares():
+    fixtures = bench.synthesize(years=2) + ('synthetic',)
+    results = bench.run(sizes=[7, 30], repeat=1, latency={k: 0.0 for k in bench.LATENCY}, fixtures=fixtures)
+    metrics = results['metrics']
+    for name in ('cold_s[30]', 'warm_refresh_s[30]', 'warm_restart_s[30]', 'history_5y_s',
+                 'payload_json_bytes[30]', 'payload_compact_gzip_bytes[7]'):
+        assert metrics[name] > 0
+    assert metrics['payload_compact_bytes[30]'] < metrics['payload_json_bytes[30]']
+    assert results['meta']['fixtures'] == 'synthetic'
+
+    assert bench.compare(results, results) == []
+    slower = {'metrics': {**metrics, 'cold_s[7]': metrics['cold_s[7]'] * 2 + 1}}
+    assert bench.compare(slower, results) == ['cold_s[7]']
+
+
+def test_cold_start_serves_archived_snapshot_without_heavy_imports():
+    fixtures = bench.synthesize(years=2) + ('synthetic',)
+    results = bench.run(sizes=[7], repeat=1, latency={k: 0.0 for k in bench.LATENCY}, fixtures=fixtures, boot=True)
+    metrics = results['metrics']
+    assert 0 < metrics['cold_start_import_s'] <= metrics['cold_start_first_response_s']
+    assert {'pandas', 'numpy', 'yfinance', 'fredapi'} <= set(results['meta']['deferred_imports'])
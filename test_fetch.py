@@ -0,0 +1,88 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from fakes import SlowFred, offline_engine
+from data_engine import FRED_SERIES, MACRO_FALLBACKS
+from refresh_schedule import RefreshSchedule
+
+
+def test_fetches_run_concurrently(tmp_path):
+    engine = offline_engine(SlowFred(delay=0.2), tmp_path)
+    start = time.monotonic()
+    data = engine.calculate_regime()
+    elapsed = time.monotonic() - start
+    # Sequential would be ~len(FRED_SERIES) * 0.2s
+    assert elapsed < 0.2 * len(FRED_SERIES) / 2
+    assert data['raw']['fred']['hy_spread'] == 110.0
+
+
+def test_fallbacks_apply_per_series(tmp_path):
+    engine = offline_engine(SlowFred(delay=0, broken=['NFCI', 'WTGANN']), tmp_path)
+    fred = engine.calculate_regime()['raw']['fred']
+    assert fred['nfci'] == MACRO_FALLBACKS['nfci']
+    assert fred['net_liquidity'] == MACRO_FALLBACKS['net_liquidity']
+    # Unaffected series keep their fetched values
+    assert fred['hy_spread'] == 110.0
+    assert fred['fed_funds'] == 110.0
+
+
+def test_slow_source_times_out(monkeypatch, tmp_path):
+    import data_engine
+    monkeypatch.setitem(data_engine.FETCH_TIMEOUTS, 'fred', 0.1)
+    engine = offline_engine(SlowFred(delay=0.5), tmp_path)
+    start = time.monotonic()
+    fred = engine.calculate_regime()['raw']['fred']
+    assert time.monotonic() - start < 0.5
+    assert fred == {k: float(v) for k, v in MACRO_FALLBACKS.items()}
+
+
+class HungFred(SlowFred):
+    """Every call blocks until `release` is set, counting the calls started."""
+    def __init__(self):
+        super().__init__(delay=0)
+        self.release = threading.Event()
+        self.calls = 0
+
+    def get_series(self, series_id, **kwargs):
+        self.calls += 1
+        self.release.wait()
+        return super().get_series(series_id)
+
+
+def test_hung_series_are_not_resubmitted(monkeypatch, tmp_path):
+    import data_engine
+    monkeypatch.setitem(data_engine.FETCH_TIMEOUTS, 'fred', 0.05)
+    fred = HungFred()
+    engine = offline_engine(fred, tmp_path)
+    try:
+        for _ in range(3):
+            # Keep the market panel due on every refresh
+            engine.schedule = RefreshSchedule()
+            engine.refresh().result()
+        assert fred.calls == len(FRED_SERIES)
+        assert engine._executor._work_queue.qsize() == 0
+        # Market downloads still get a worker
+        assert len(engine.download.calls) == 3
+    finally:
+        fred.release.set()
+
+
+def test_readjusted_history_is_rescaled_not_spliced(tmp_path):
+    engine = offline_engine(SlowFred(delay=0), tmp_path)
+    engine.calculate_regime()
+    panel = engine.download.panel
+    # A 2:1 split on the last stored day: yfinance halves every earlier adjusted close
+    split = panel.index[-1]
+    adjusted = panel.copy()
+    adjusted.loc[adjusted.index < split, 'SPY'] /= 2
+    adjusted.loc[split, 'SPY'] /= 2
+    adjusted.loc[split + pd.offsets.BDay(1)] = adjusted.iloc[-1] * 1.01
+    engine.download.panel = adjusted
+    engine.schedule = RefreshSchedule()
+    engine.refresh().result()
+
+    stored = engine.store.read('yf/SPY')
+    assert np.allclose(stored.to_numpy(), adjusted['SPY'].to_numpy())
+    # Tickers without a corporate action are left as stored
+    assert np.allclose(engine.store.read('yf/GLD').to_numpy(), adjusted['GLD'].to_numpy())
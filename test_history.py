@@ -0,0 +1,61 @@
+import time
+import numpy as np
+import pandas as pd
+from fakes import CountingFred, SlowFred, offline_engine, synthetic_market
+from data_engine import FRED_SERIES, composite_history
+from metrics import FALLBACKS
+
+
+def test_history_matches_latest_snapshot(tmp_path):
+    engine = offline_engine(SlowFred(delay=0), tmp_path)
+    snapshot = engine.calculate_regime()
+    history = engine.calculate_history(start='2024-03-01')
+    last = history.iloc[-1]
+    assert history.index[0] >= pd.Timestamp('2024-03-01')
+    assert np.isclose(last['composite'], snapshot['composite'])
+    for name, value in snapshot['components'].items():
+        assert np.isclose(last[name], value)
+
+
+def test_weekly_series_is_joined_as_of():
+    calendar = pd.bdate_range('2024-01-01', '2024-03-29')
+    closes = synthetic_market(['SPY', 'GLD', 'HG=F', 'DX-Y.NYB', 'TLT', 'XLK', 'XLP'], days=len(calendar))
+    closes.index = calendar
+    nfci = pd.Series([-0.8, 0.4], index=pd.to_datetime(['2024-01-05', '2024-03-01']))
+    history = composite_history({'NFCI': nfci}, closes)
+    assert history.loc['2024-02-29', 'Monetary'] == 1.0   # -(-0.8) / 0.8
+    # The Friday print is only published the following Wednesday
+    assert history.loc['2024-03-05', 'Monetary'] == 1.0
+    assert history.loc['2024-03-06', 'Monetary'] == -0.5  # -(0.4) / 0.8
+
+
+def test_years_of_history_is_fast():
+    calendar = pd.bdate_range('2005-01-01', '2024-12-31')
+    closes = synthetic_market(['SPY', 'GLD', 'HG=F', 'DX-Y.NYB', 'TLT', 'XLK', 'XLP'], days=len(calendar))
+    closes.index = calendar
+    weekly = pd.Series(np.linspace(-1, 1, 1044), index=pd.date_range('2005-01-07', periods=1044, freq='W-FRI'))
+    start = time.perf_counter()
+    history = composite_history({'NFCI': weekly, 'WALCL': weekly * 1e6, 'WTGANN': weekly, 'RRPONTSYD': weekly}, closes)
+    assert time.perf_counter() - start < 1.0
+    assert len(history) == len(calendar) - 21
+
+
+def test_history_endpoint(client):
+    body = client.get('/api/macro/history?start=2024-05-01&end=2024-05-31').get_json()
+    assert body['dates'][0] >= '2024-05-01' and body['dates'][-1] <= '2024-05-31'
+    assert len(body['composite']) == len(body['dates']) == len(body['components']['Growth'])
+    assert client.get('/api/macro/history?start=not-a-date').status_code == 400
+
+
+def test_history_without_fetch_only_reads_the_store(tmp_path):
+    fred = CountingFred(delay=0)
+    engine = offline_engine(fred, tmp_path)
+    engine.calculate_regime()
+    calls, downloads = fred.calls, len(engine.download.calls)
+    fallbacks = {sid: FALLBACKS.value(input=sid, kind='stored') for sid in FRED_SERIES}
+    # Reaches further back than the store holds, which would otherwise trigger a backfill
+    history = engine.calculate_history(start='2023-01-01', fetch=False)
+    assert fred.calls == calls and len(engine.download.calls) == downloads
+    assert not history.empty
+    # Reading the store is not a fallback: nothing was fetched, so nothing failed
+    assert {sid: FALLBACKS.value(input=sid, kind='stored') for sid in FRED_SERIES} == fallbacks
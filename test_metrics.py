@@ -0,0 +1,66 @@
+from fakes import SlowFred, offline_engine
+from metrics import (Registry, FALLBACKS, SNAPSHOT_REQUESTS, STAGE_SECONDS, UPSTREAM_CALLS,
+                     UPSTREAM_SKIPPED, UPSTREAM_TIMEOUTS)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram('x_seconds', 'Test latency.', ['source'], buckets=(0.1, 1))
+    latency.observe(0.05, source='a')
+    latency.observe(0.5, source='a')
+    text = registry.render()
+    assert '# TYPE x_seconds histogram' in text
+    assert 'x_seconds_bucket{source="a",le="0.1"} 1' in text
+    assert 'x_seconds_bucket{source="a",le="1"} 2' in text
+    assert 'x_seconds_bucket{source="a",le="+Inf"} 2' in text
+    assert 'x_seconds_count{source="a"} 2' in text
+
+
+def test_engine_counts_upstream_calls_and_fallbacks(tmp_path):
+    calls = UPSTREAM_CALLS.value(source='fred', outcome='error')
+    fallbacks = FALLBACKS.value(input='nfci', kind='placeholder')
+    computes = STAGE_SECONDS.count(stage='compute')
+    cold = SNAPSHOT_REQUESTS.value(state='cold')
+
+    engine = offline_engine(SlowFred(delay=0, broken=['NFCI']), tmp_path)
+    engine.calculate_regime()
+    engine.calculate_regime()
+
+    assert UPSTREAM_CALLS.value(source='fred', outcome='error') == calls + 1
+    assert FALLBACKS.value(input='nfci', kind='placeholder') == fallbacks + 1
+    assert STAGE_SECONDS.count(stage='compute') == computes + 1
+    assert SNAPSHOT_REQUESTS.value(state='cold') == cold + 1
+
+
+def test_schedule_skips_and_timeouts_are_counted(monkeypatch, tmp_path):
+    import data_engine
+    engine = offline_engine(SlowFred(delay=0), tmp_path)
+    engine.refresh().result()
+    skipped = UPSTREAM_SKIPPED.value(source='market', reason='not_due')
+    engine.schedule.mark_checked('market')
+    engine.refresh().result()
+    assert UPSTREAM_SKIPPED.value(source='market', reason='not_due') == skipped + 1
+
+    timeouts = UPSTREAM_TIMEOUTS.value(source='fred')
+    monkeypatch.setitem(data_engine.FETCH_TIMEOUTS, 'fred', 0.05)
+    offline_engine(SlowFred(delay=0.3), tmp_path / 'slow').refresh().result()
+    assert UPSTREAM_TIMEOUTS.value(source='fred') > timeouts
+
+
+def test_metrics_endpoint(client):
+    client.get('/api/macro')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'macro_request_seconds_count{endpoint="get_macro_data",status="200"}' in text
+    assert 'macro_stage_seconds_bucket{stage="market",le="+Inf"}' in text
+    assert 'macro_snapshot_age_seconds ' in text
+
+
+def test_profile_requires_opt_in(client, app_module, monkeypatch):
+    assert client.get('/api/macro?profile=1').is_json
+    monkeypatch.setattr(app_module, 'PROFILING', True)
+    response = client.get('/api/macro?profile=1')
+    assert response.mimetype == 'text/plain'
+    assert '_compute_regime' in response.get_data(as_text=True)
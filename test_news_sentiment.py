@@ -0,0 +1,137 @@
+import json
+from datetime import datetime, timezone
+import pytest
+from fakes import FakeClock, SlowFred, offline_engine
+from metrics import UPSTREAM_SKIPPED
+from news_sentiment import NewsClient, SentimentBook, TokenBucket, parse_quota, SENTIMENT_HALF_LIFE
+
+NOW = 1719590400.0  # 2024-06-28T16:00:00Z
+
+
+def article(i, score, hours_ago=0, tickers=(), topics=()):
+    stamp = NOW - hours_ago * 3600
+    return {
+        'url': f'https://news.example/{i}',
+        'time_published': datetime.fromtimestamp(stamp, timezone.utc).strftime('%Y%m%dT%H%M%S'),
+        'overall_sentiment_score': score,
+        'ticker_sentiment': [{'ticker': t, 'relevance_score': '1', 'ticker_sentiment_score': str(s)} for t, s in tickers],
+        'topics': [{'topic': t, 'relevance_score': '1'} for t in topics]
+    }
+
+
+class FakeSession:
+    def __init__(self, body):
+        self.body = body
+        self.params = []
+
+    def get(self, url, params=None, timeout=None):
+        self.params.append(params)
+        body = self.body
+
+        class Response:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return body
+        return Response()
+
+
+def test_parse_quota():
+    assert parse_quota('25/day') == (25, 86400)
+    assert parse_quota('75/minute') == (75, 60)
+    with pytest.raises(ValueError):
+        parse_quota('lots')
+
+
+def test_token_bucket_refills_at_the_quota_rate():
+    clock = FakeClock(0.0)
+    bucket = TokenBucket(2, 60, clock=clock)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    clock.now = 30
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_book_decays_older_articles(tmp_path):
+    book = SentimentBook(str(tmp_path / 'sentiment.json'), clock=lambda: NOW)
+    assert book.summary()['score'] is None
+    feed = [article(1, 0.6, tickers=[('AAPL', 0.5)], topics=['Technology']),
+            article(2, -0.3, hours_ago=SENTIMENT_HALF_LIFE / 3600, tickers=[('AAPL', -0.5)], topics=['Technology'])]
+    assert book.ingest(feed) == 2
+    summary = book.summary()
+    # The day-old article carries half the weight
+    assert summary['score'] == pytest.approx((0.6 - 0.3 * 0.5) / 1.5)
+    assert summary['tickers']['AAPL']['score'] == pytest.approx((0.5 - 0.25) / 1.5)
+    assert summary['topics']['Technology']['score'] == pytest.approx(summary['score'])
+    assert summary['articles'] == 2
+
+
+def test_book_only_processes_new_articles_and_survives_restart(tmp_path):
+    path = str(tmp_path / 'sentiment.json')
+    book = SentimentBook(path, clock=lambda: NOW)
+    book.ingest([article(1, 0.6), article(2, 0.2)])
+    assert book.ingest([article(1, 0.6), article(2, 0.2)]) == 0
+
+    reopened = SentimentBook(path, clock=lambda: NOW + 3600)
+    assert reopened.summary() == book.summary()
+    assert reopened.time_from() == '20240628T1600'
+    assert reopened.ingest([article(2, 0.2), article(3, -1.0, hours_ago=-1)]) == 1
+    assert reopened.summary()['score'] < book.summary()['score']
+    assert json.load(open(path))['seen'].keys() == {a['url'] for a in (article(1, 0), article(2, 0), article(3, 0))}
+
+
+def test_client_caches_per_window_and_respects_the_quota():
+    clock = FakeClock(0.0)
+    client = NewsClient('key', quota='2/hour', window=60, clock=clock, since=lambda: '20240628T1600')
+    session = client._session = FakeSession({'feed': [article(1, 0.5)]})
+    assert client()['feed'][0]['url'].endswith('/1')
+    assert session.params[0]['time_from'] == '20240628T1600'
+    assert session.params[0]['function'] == 'NEWS_SENTIMENT'
+
+    cached = UPSTREAM_SKIPPED.value(source='sentiment', reason='cached')
+    client()
+    assert len(session.params) == 1
+    assert UPSTREAM_SKIPPED.value(source='sentiment', reason='cached') == cached + 1
+
+    # Next window spends the second token; the one after finds the bucket empty
+    clock.now = 60
+    assert client() is not None
+    clock.now = 120
+    limited = UPSTREAM_SKIPPED.value(source='sentiment', reason='rate_limited')
+    assert client() is None
+    assert UPSTREAM_SKIPPED.value(source='sentiment', reason='rate_limited') == limited + 1
+
+
+def test_quota_notes_are_errors_not_empty_feeds():
+    client = NewsClient('key', quota='5/minute')
+    client._session = FakeSession({'Information': 'rate limit reached'})
+    with pytest.raises(RuntimeError):
+        client()
+
+
+def test_engine_keeps_sentiment_when_the_quota_runs_out(tmp_path):
+    engine = offline_engine(SlowFred(delay=0), tmp_path)
+    responses = [{'feed': [article(1, 0.5, tickers=[('SPY', 0.4)], topics=['Financial Markets'])]}, None]
+    engine.news = lambda: responses.pop(0)
+
+    first = engine.calculate_regime()
+    assert first['raw']['sentiment'] == pytest.approx(0.5)
+    assert first['raw']['news']['tickers']['SPY']['score'] == pytest.approx(0.4)
+    assert set(first['raw']['news']['topics']) == {'Financial Markets'}
+
+    second = engine.refresh().result()
+    assert responses == []
+    assert second['raw']['sentiment'] == pytest.approx(0.5)
+
+
+def test_bucket_state_survives_restarts(tmp_path):
+    path = str(tmp_path / 'quota.json')
+    clock = FakeClock(NOW)
+    assert TokenBucket(2, 3600, clock=clock, path=path).try_acquire()
+    assert TokenBucket(2, 3600, clock=clock, path=path).try_acquire()
+    # A fresh process does not get a fresh allowance
+    assert not TokenBucket(2, 3600, clock=clock, path=path).try_acquire()
+    clock.now += 1800
+    assert NewsClient('key', quota='2/hour', quota_path=path, clock=clock).limiter.try_acquire()
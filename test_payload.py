@@ -0,0 +1,55 @@
+import base64
+import gzip
+import json
+import numpy as np
+from fakes import SlowFred, offline_engine
+from payload import compact_payload
+
+
+def unpack(b64):
+    return np.frombuffer(base64.b64decode(b64), dtype='<f4')
+
+
+def test_compact_payload_round_trips(tmp_path):
+    data = offline_engine(SlowFred(delay=0), tmp_path).calculate_regime()
+    cols = compact_payload(data)['columns']
+    history = unpack(cols['momentum_history']).reshape(len(cols['history_tickers']), -1)
+    expected = data['raw']['market']['momentum_history']['series']
+    assert np.allclose(history[cols['history_tickers'].index('SPY')], expected['SPY'], rtol=1e-6)
+
+    upper = unpack(cols['correlation'])
+    tickers = cols['tickers']
+    i, j = np.triu_indices(len(tickers), k=1)
+    pairs = dict(zip(zip(np.array(tickers)[i], np.array(tickers)[j]), upper))
+    assert np.isclose(pairs[('SPY', 'GLD')], data['raw']['market']['correlation']['SPY']['GLD'])
+
+    rolling = dict(zip(zip(np.array(tickers)[i], np.array(tickers)[j]), unpack(cols['rolling_correlation']['20d'])))
+    assert np.isclose(rolling[('SPY', 'GLD')], data['raw']['market']['rolling_correlation']['20d']['SPY']['GLD'])
+
+
+def test_compact_is_smaller_and_gzipped(client):
+    full = client.get('/api/macro')
+    compact = client.get('/api/macro?format=compact', headers={'Accept-Encoding': 'gzip'})
+    assert compact.headers['Content-Encoding'] == 'gzip'
+    body = gzip.decompress(compact.data)
+    assert len(compact.data) < len(body) < len(full.data) / 2
+    assert json.loads(body)['composite'] == full.get_json()['composite']
+
+
+def test_unchanged_snapshot_returns_304(client):
+    for query in ('', '?format=compact'):
+        first = client.get(f'/api/macro{query}')
+        etag = first.headers['ETag']
+        again = client.get(f'/api/macro{query}', headers={'If-None-Match': etag})
+        assert again.status_code == 304 and not again.data
+        assert again.headers['X-Snapshot-Stale'] == 'false'
+
+
+def test_since_returns_only_new_points(client):
+    dates = client.get('/api/macro').get_json()['raw']['market']['momentum_history']['dates']
+    tail = client.get(f'/api/macro?since={dates[-4]}').get_json()['raw']['market']['momentum_history']
+    assert tail['dates'] == dates[-3:]
+    assert len(tail['series']['SPY']) == 3
+    compact = client.get(f'/api/macro?format=compact&since={dates[-4]}').get_json()['columns']
+    assert compact['dates'] == dates[-3:]
+    assert len(unpack(compact['momentum_history'])) == 3 * len(compact['history_tickers'])
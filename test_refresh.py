@@ -0,0 +1,119 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+from fakes import CountingFred, FakeClock, offline_engine
+from refresh_schedule import RefreshSchedule
+
+
+def test_concurrent_cold_requests_share_one_compute(tmp_path):
+    fred = CountingFred(delay=0.1)
+    engine = offline_engine(fred, tmp_path)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(engine.calculate_regime())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert fred.calls == 11
+    assert all(r is results[0] for r in results)
+
+
+def test_expired_snapshot_is_served_while_revalidating(tmp_path):
+    fred = CountingFred(delay=0.2)
+    engine = offline_engine(fred, tmp_path)
+    first = engine.calculate_regime()
+    engine._cache_ttl = 0
+
+    start = time.monotonic()
+    assert engine.calculate_regime() is first
+    assert time.monotonic() - start < 0.1
+    assert engine.snapshot_meta()['stale'] and engine.snapshot_meta()['refreshing']
+
+    engine.refresh().result()
+    assert engine.calculate_regime() is not first
+    # No FRED input is due again yet, so the recompute is served from the store
+    assert fred.calls == 11
+
+
+def test_background_refresh_warms_before_first_request(tmp_path):
+    engine = offline_engine(CountingFred(delay=0), tmp_path)
+    engine.start_background_refresh()
+    try:
+        deadline = time.monotonic() + 5
+        while engine.snapshot_age() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        meta = engine.snapshot_meta()
+        assert meta['computed_at'] is not None and not meta['stale']
+    finally:
+        engine.stop_background_refresh()
+
+
+def test_schedule_waits_for_next_observation():
+    clock = FakeClock(datetime(2024, 6, 3, 12))  # Monday
+    schedule = RefreshSchedule(clock=clock)
+    assert schedule.due('CPIAUCSL', pd.Timestamp('2024-05-01'))
+    schedule.mark_checked('CPIAUCSL')
+    clock.now += timedelta(hours=13)
+    # May CPI is already stored; June's observation cannot exist before July
+    assert not schedule.due('CPIAUCSL', pd.Timestamp('2024-06-01'))
+    assert schedule.due('CPIAUCSL', pd.Timestamp('2024-05-01'))
+
+    schedule.mark_checked('WALCL')
+    clock.now += timedelta(hours=1)
+    assert not schedule.due('WALCL', pd.Timestamp('2024-05-22'))
+    clock.now += timedelta(hours=6)
+    assert schedule.due('WALCL', pd.Timestamp('2024-05-22'))
+
+
+def test_market_is_not_polled_over_the_weekend():
+    clock = FakeClock(datetime(2024, 6, 7, 22))  # Friday night
+    schedule = RefreshSchedule(clock=clock)
+    schedule.mark_checked('market')
+    clock.now += timedelta(hours=12)
+    assert schedule.due('market')
+    schedule.mark_checked('market')
+    clock.now += timedelta(hours=12)
+    assert not schedule.due('market')
+    clock.now += timedelta(days=2)  # Monday night
+    assert schedule.due('market')
+
+
+class MetadataFred(CountingFred):
+    def __init__(self):
+        super().__init__(delay=0)
+        self.info_calls = 0
+        self.last_updated = '2024-12-12 07:41:02-06'
+
+    def get_series_info(self, series_id):
+        self.info_calls += 1
+        return pd.Series({'last_updated': self.last_updated})
+
+
+def test_unchanged_metadata_skips_observation_fetch(tmp_path):
+    fred = MetadataFred()
+    engine = offline_engine(fred, tmp_path)
+    clock = FakeClock(datetime(2026, 10, 14, 12))
+    engine.schedule = RefreshSchedule(clock=clock)
+    engine.calculate_regime()
+    assert fred.calls == 11 and fred.info_calls == 11
+
+    # Everything is due again, but FRED reports no new release
+    clock.now += timedelta(days=2)
+    engine.refresh().result()
+    assert fred.calls == 11 and fred.info_calls == 22
+    clock.now += timedelta(days=2)
+    engine.refresh().result()
+    assert fred.calls == 11 and fred.info_calls == 33
+
+    fred.last_updated = '2024-12-19 07:40:00-06'
+    clock.now += timedelta(days=2)
+    engine.refresh().result()
+    assert fred.calls == 22
+
+
+def test_unchanged_inputs_reuse_derived_values(tmp_path):
+    engine = offline_engine(CountingFred(delay=0), tmp_path)
+    first = engine.calculate_regime()
+    second = engine.refresh().result()
+    assert second['raw']['market']['momentum_history'] is first['raw']['market']['momentum_history']
@@ -0,0 +1,126 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from fakes import SlowFred, offline_engine, synthetic_market
+from data_engine import CORE_ASSETS, QUOTE_FIELDS
+from rolling import RollingWindow, horizon_stats, MOMENTUM_HORIZONS, CORRELATION_WINDOWS, EWMA_DECAY
+
+
+def batch(df):
+    """The full-window pandas/numpy definitions the rolling window must reproduce."""
+    return {
+        'momentum': df.pct_change(21).iloc[-1].to_numpy(),
+        'correlation': np.corrcoef(df.to_numpy(), rowvar=False),
+        'volatility': (df.pct_change().std() * np.sqrt(252) * 100).to_numpy()
+    }
+
+
+def assert_matches(window, df):
+    expected = batch(df)
+    assert np.allclose(window.momentum(), expected['momentum'])
+    assert np.allclose(window.correlation(), expected['correlation'], atol=1e-9)
+    assert np.allclose(window.volatility(), expected['volatility'])
+
+
+def test_seeded_window_matches_batch():
+    df = synthetic_market(CORE_ASSETS)
+    window = RollingWindow.from_frame(df)
+    assert_matches(window, df)
+    cg_ratio, cg_momentum = window.ratio('HG=F', 'GLD')
+    ratio = df['HG=F'] / df['GLD']
+    assert np.isclose(cg_ratio, ratio.iloc[-1])
+    assert np.isclose(cg_momentum, ratio.pct_change(21).iloc[-1])
+
+
+def test_pushes_slide_the_window():
+    df = synthetic_market(CORE_ASSETS, days=400)
+    window = RollingWindow.from_frame(df.iloc[:120])
+    # Past several periodic rebuilds
+    for date, row in df.iloc[120:].iterrows():
+        window.push(row.to_numpy(), date)
+    assert len(window) == 120
+    assert window.last_date == df.index[-1]
+    assert_matches(window, df.iloc[-120:])
+
+
+def test_revise_replaces_latest_bar_and_carries_missing_prices():
+    df = synthetic_market(CORE_ASSETS)
+    window = RollingWindow.from_frame(df)
+    window.revise({'SPY': df['SPY'].iloc[-1] * 1.05, 'UNKNOWN': 1.0, 'GLD': np.nan})
+    revised = df.copy()
+    revised.iloc[-1, revised.columns.get_loc('SPY')] *= 1.05
+    assert window.latest('GLD') == df['GLD'].iloc[-1]
+    assert_matches(window, revised)
+
+
+def test_apply_quotes_publishes_without_refetching(tmp_path):
+    engine = offline_engine(SlowFred(delay=0), tmp_path)
+    with pytest.raises(RuntimeError):
+        engine.apply_quotes({'SPY': 1.0})
+    first = engine.calculate_regime()
+    published, ticks = [], []
+    engine.subscribe(lambda result, computed_at: published.append(result))
+    engine.subscribe_quotes(lambda update, computed_at: ticks.append(update))
+    downloads = len(engine.download.calls)
+    age = engine.snapshot_age()
+
+    spy = engine._window.latest('SPY')
+    result = engine.apply_quotes({'SPY': spy * 1.10})
+    assert engine.calculate_regime() is result
+    # Quote subscribers get only what the tick changed, full subscribers nothing
+    assert published == []
+    assert set(ticks[0]['raw']['market']) == set(QUOTE_FIELDS)
+    assert ticks[0]['composite'] == result['composite']
+    assert result['raw']['market']['momentum']['SPY'] > first['raw']['market']['momentum']['SPY']
+    assert result['raw']['fred'] == first['raw']['fred']
+    assert len(engine.download.calls) == downloads
+    # Quotes do not postpone the next full refresh
+    assert engine.snapshot_age() >= age
+
+    last = engine._window.last_date
+    engine.apply_quotes({'SPY': spy}, date=last + pd.Timedelta(days=3))
+    assert engine._window.last_date == last + pd.Timedelta(days=3)
+
+
+def test_horizon_stats_match_pandas():
+    df = synthetic_market(CORE_ASSETS, days=140)
+    stats = horizon_stats(df.to_numpy())
+    returns = df.pct_change().dropna()
+    for h in MOMENTUM_HORIZONS:
+        assert np.allclose(stats['momentum'][h], df.pct_change(h).iloc[-1].to_numpy())
+    for w in CORRELATION_WINDOWS:
+        assert np.allclose(stats['correlation'][w], returns.iloc[-w:].corr().to_numpy())
+    ewma = np.sqrt((returns ** 2).ewm(alpha=1 - EWMA_DECAY).mean().iloc[-1]) * np.sqrt(252) * 100
+    assert np.allclose(stats['ewma_vol'], ewma.to_numpy())
+    # Too little history for the horizon comes back as NaN
+    assert np.isnan(horizon_stats(df.iloc[-50:].to_numpy())['momentum'][63]).all()
+
+
+def test_snapshot_carries_horizons(tmp_path):
+    data = offline_engine(SlowFred(delay=0), tmp_path).calculate_regime()
+    market = data['raw']['market']
+    assert set(market['momentum_horizons']) == {f'{h}d' for h in MOMENTUM_HORIZONS}
+    assert set(market['rolling_correlation']) == {f'{w}d' for w in CORRELATION_WINDOWS}
+    assert market['rolling_correlation']['20d']['SPY']['SPY'] == pytest.approx(1)
+    assert set(market['ewma_vol']) == set(CORE_ASSETS)
+    assert data['summaries']['trend']['status']
+    assert set(data['summaries']['correlation']['rolling_avg_abs']) == {'20d', '60d'}
+
+
+def test_long_horizons_use_closes_beyond_the_market_window(tmp_path):
+    engine = offline_engine(SlowFred(delay=0), tmp_path)
+    panel = engine.download.panel = synthetic_market(CORE_ASSETS, days=300)
+    market = engine.calculate_regime()['raw']['market']
+    assert market['momentum_horizons']['126d']['SPY'] == pytest.approx(panel['SPY'].pct_change(126).iloc[-1])
+    # The momentum history still covers the six-month window only
+    assert market['momentum_history']['dates'][0] > str(panel.index[-1] - pd.DateOffset(months=6))
+
+
+def test_short_history_serializes_as_null(tmp_path):
+    engine = offline_engine(SlowFred(delay=0), tmp_path)
+    engine.download.panel = synthetic_market(CORE_ASSETS, days=40)
+    market = engine.calculate_regime()['raw']['market']
+    assert market['rolling_correlation']['60d']['SPY']['GLD'] is None
+    assert market['momentum_horizons']['126d']['SPY'] is None
+    json.dumps(market, allow_nan=False)
@@ -0,0 +1,68 @@
+import time
+import pytest
+from fakes import CountingFred, SlowFred, offline_engine
+from data_engine import FIELD_SECTIONS, parse_fields
+
+
+def test_parse_fields():
+    assert parse_fields('composite, components') == ['composite', 'components']
+    assert parse_fields('raw,raw.fred') == ['raw.fred', 'raw.market', 'raw.sentiment', 'raw.news']
+    with pytest.raises(ValueError):
+        parse_fields('composite,bogus')
+    with pytest.raises(ValueError):
+        parse_fields(' , ')
+
+
+def test_narrow_request_fetches_only_its_section(tmp_path):
+    fred = CountingFred(delay=0)
+    engine = offline_engine(fred, tmp_path)
+    data, meta = engine.get_fields(['raw.fred'])
+    assert list(data) == ['raw'] and list(data['raw']) == ['fred']
+    assert fred.calls == 11
+    assert engine.download.calls == []
+    assert list(meta['sections']) == ['macro']
+
+    data, _ = engine.get_fields(['raw.sentiment'])
+    assert data == {'raw': {'sentiment': 0.15}}
+    assert fred.calls == 11 and engine.download.calls == []
+
+
+def test_fields_match_the_full_snapshot(tmp_path):
+    engine = offline_engine(SlowFred(delay=0), tmp_path)
+    partial, _ = engine.get_fields(['composite', 'components', 'summaries'])
+    full = engine.calculate_regime()
+    assert partial == {k: full[k] for k in ('composite', 'components', 'summaries')}
+    assert set(full['raw']) == {f.split('.')[1] for f in FIELD_SECTIONS if f.startswith('raw.')}
+
+
+def test_expired_section_is_served_while_revalidating(tmp_path):
+    fred = CountingFred(delay=0.2)
+    engine = offline_engine(fred, tmp_path)
+    first, _ = engine.get_fields(['raw.fred'])
+    engine._cache_ttl = 0
+
+    start = time.monotonic()
+    data, meta = engine.get_fields(['raw.fred'])
+    assert time.monotonic() - start < 0.1
+    assert data == first and meta['stale'] and meta['refreshing']
+    deadline = time.monotonic() + 5
+    while engine._section_inflight and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert engine.get_fields(['raw.fred'])[1]['sections']['macro'] > meta['sections']['macro']
+
+
+def test_fields_endpoint(client):
+    response = client.get('/api/macro?fields=composite,components')
+    body = response.get_json()
+    assert set(body) == {'composite', 'components', 'meta'}
+    assert client.get('/api/macro?fields=composite', headers={'If-None-Match': response.headers['ETag']}).status_code == 200
+    etag = client.get('/api/macro?fields=composite').headers['ETag']
+    assert client.get('/api/macro?fields=composite', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/macro?fields=nope').status_code == 400
+
+
+def test_section_endpoint(client):
+    body = client.get('/api/macro/sections/scores').get_json()
+    assert set(body) == {'composite', 'components', 'meta'}
+    assert set(client.get('/api/macro/sections/market').get_json()['raw']) == {'market'}
+    assert client.get('/api/macro/sections/nope').status_code == 404
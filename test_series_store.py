@@ -0,0 +1,80 @@
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from fakes import FakeClock, SlowFred, offline_engine
+from refresh_schedule import RefreshSchedule
+from series_store import SeriesStore
+
+
+def test_upsert_appends_and_overwrites_tail(tmp_path):
+    store = SeriesStore(str(tmp_path))
+    idx = pd.date_range('2024-01-01', periods=5, freq='D')
+    store.upsert('DGS10', pd.Series([1.0, 2.0, 3.0, 4.0, 5.0], index=idx))
+    # Revised last print plus two new observations
+    store.upsert('DGS10', pd.Series([5.5, 6.0, 7.0], index=pd.date_range('2024-01-05', periods=3, freq='D')))
+    s = store.read('DGS10')
+    assert s.tolist() == [1.0, 2.0, 3.0, 4.0, 5.5, 6.0, 7.0]
+    assert store.last_date('DGS10') == pd.Timestamp('2024-01-07')
+    assert store.read('DGS10', start='2024-01-06').tolist() == [6.0, 7.0]
+    assert store.keys() == ['DGS10']
+
+
+def test_restart_is_warm(tmp_path):
+    idx = pd.date_range('2024-01-01', periods=3, freq='D')
+    SeriesStore(str(tmp_path)).upsert('yf/HG=F', pd.Series([1.0, np.nan, 3.0], index=idx))
+    reopened = SeriesStore(str(tmp_path))
+    assert reopened.keys() == ['yf/HG=F']
+    assert reopened.read('yf/HG=F').tolist() == [1.0, 3.0]
+    assert reopened.read('missing').empty
+    assert reopened.last_date('missing') is None
+
+
+class RecordingFred(SlowFred):
+    def __init__(self):
+        super().__init__(delay=0)
+        self.starts = []
+
+    def get_series(self, series_id, observation_start=None, **kwargs):
+        self.starts.append(observation_start)
+        return super().get_series(series_id)
+
+
+def test_refresh_only_requests_new_observations(tmp_path):
+    fred = RecordingFred()
+    engine = offline_engine(fred, tmp_path)
+    clock = FakeClock(datetime(2026, 10, 14, 12))
+    engine.schedule = RefreshSchedule(clock=clock)
+    engine.calculate_regime()
+    assert engine.download.calls[-1]['period'] == '1y'
+    assert set(fred.starts) == {None}
+
+    fred.starts.clear()
+    clock.now += timedelta(days=1)
+    engine._cache = None
+    data = engine.calculate_regime()
+    assert set(fred.starts) == {'2024-12-01'}
+    # A week of overlap with the stored closes, to catch re-adjusted history
+    assert engine.download.calls[-1]['start'] == '2024-06-21'
+    # Overlapping observations replace, not duplicate
+    assert len(engine.store.read('CPIAUCSL')) == 24
+    assert len(data['raw']['market']['momentum_history']['dates']) > 0
+
+
+def test_writes_wait_for_other_processes_reading(tmp_path):
+    fcntl = pytest.importorskip('fcntl')
+    store = SeriesStore(str(tmp_path))
+    idx = pd.date_range('2024-01-01', periods=3, freq='D')
+    store.upsert('DGS10', pd.Series([1.0, 2.0, 3.0], index=idx))
+    # A separate open file description behaves like another process's reader
+    with open(tmp_path / '.lock', 'a') as other:
+        fcntl.flock(other, fcntl.LOCK_SH)
+        assert store.read('DGS10').tolist() == [1.0, 2.0, 3.0]
+        writer = threading.Thread(target=store.upsert, args=('DGS10', pd.Series([4.0], index=idx[-1:])))
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive()
+        fcntl.flock(other, fcntl.LOCK_UN)
+    writer.join(5)
+    assert store.read('DGS10').tolist() == [1.0, 2.0, 4.0]
@@ -0,0 +1,58 @@
+import os
+import time
+import pytest
+from fakes import SlowFred, offline_engine
+from snapshot_store import SharedSnapshot
+
+
+def test_readers_see_atomic_swaps(tmp_path):
+    path = str(tmp_path / 'snapshot.json')
+    producer, reader = SharedSnapshot(path), SharedSnapshot(path)
+    producer.write({'composite': 0.1}, '2024-06-28T10:00:00')
+    result, meta = reader.get_snapshot()
+    assert result == {'composite': 0.1} and meta['computed_at'] == '2024-06-28T10:00:00'
+    assert meta['stale']
+
+    producer.write({'composite': 0.2}, '2024-06-28T10:05:00')
+    assert reader.get_snapshot()[0] == {'composite': 0.2}
+    # Only the published file remains; temp files were renamed into place
+    assert os.listdir(tmp_path) == ['snapshot.json']
+
+
+def test_reader_times_out_without_producer(tmp_path):
+    with pytest.raises(TimeoutError):
+        SharedSnapshot(str(tmp_path / 'snapshot.json')).get_snapshot(wait=0.2)
+
+
+def test_single_producer_is_elected(tmp_path):
+    path = str(tmp_path / 'snapshot.json')
+    workers = [SharedSnapshot(path, poll=0.05) for _ in range(3)]
+    engines = [offline_engine(SlowFred(delay=0), tmp_path / f'store{i}') for i in range(3)]
+    seen = []
+    for worker, engine in zip(workers, engines):
+        worker.start(engine, listener=lambda result, computed_at: seen.append(computed_at))
+    try:
+        result, meta = workers[2].get_snapshot(wait=5)
+        assert 'composite' in result
+        assert sum(w.is_producer for w in workers) == 1
+        assert sum(e.snapshot_age() is not None for e in engines) == 1
+        deadline = time.monotonic() + 2
+        while len(seen) < 3 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert seen.count(meta['computed_at']) == 3
+    finally:
+        for engine in engines:
+            engine.stop_background_refresh()
+
+
+def test_quote_ticks_are_written_once_per_poll(tmp_path):
+    path = str(tmp_path / 'snapshot.json')
+    producer, reader = SharedSnapshot(path), SharedSnapshot(path)
+    producer.write({'composite': 0.1, 'raw': {'market': {'tlt_vol': 15.0}, 'fred': {'nfci': -0.5}}}, '2024-06-28T10:00:00')
+    for second, vol in enumerate((16.0, 17.0, 18.0), 1):
+        producer._quote_tick({'composite': vol / 100, 'raw': {'market': {'tlt_vol': vol}}}, f'2024-06-28T10:00:0{second}')
+    assert reader.get_snapshot()[0]['composite'] == 0.1
+    producer._flush()
+    result, meta = reader.get_snapshot()
+    assert result == {'composite': 0.18, 'raw': {'market': {'tlt_vol': 18.0}, 'fred': {'nfci': -0.5}}}
+    assert meta['computed_at'] == '2024-06-28T10:00:03'
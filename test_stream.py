@@ -0,0 +1,112 @@
+import json
+import threading
+import stream as stream_module
+from fakes import SlowFred, offline_engine
+from stream import SnapshotBroadcaster, apply_patch, merge_patch, _SAME
+
+
+def parse(frame):
+    fields = dict(line.split(': ', 1) for line in frame.decode().strip().split('\n'))
+    return fields['event'], int(fields['id']), json.loads(fields['data'])
+
+
+def test_merge_patch_only_carries_changes():
+    old = {'composite': 0.1, 'components': {'Credit': 0.2, 'Growth': 0.3}, 'gone': 1}
+    new = {'composite': 0.1, 'components': {'Credit': 0.25, 'Growth': 0.3}, 'added': [1]}
+    assert merge_patch(old, new) == {'components': {'Credit': 0.25}, 'gone': None, 'added': [1]}
+    assert merge_patch(new, new) is _SAME
+    assert merge_patch({'x': float('nan')}, {'x': float('nan')}) is _SAME
+    assert apply_patch(old, merge_patch(old, new)) == new
+
+
+def test_one_publish_fans_out_to_all_subscribers():
+    broadcaster = SnapshotBroadcaster(heartbeat=0.05)
+    streams = [broadcaster.stream() for _ in range(50)]
+    for s in streams:
+        assert next(s) == b"retry: 5000\n\n"
+    broadcaster.publish({'composite': 0.1, 'components': {'Credit': 0.2}}, '2024-06-28T10:00:00')
+    frames = [next(s) for s in streams]
+    assert broadcaster.subscribers == 50
+    # Every client receives the very same encoded bytes
+    assert all(f is frames[0] for f in frames)
+    assert parse(frames[0])[:2] == ('snapshot', 1)
+
+    broadcaster.publish({'composite': 0.1, 'components': {'Credit': 0.4}}, '2024-06-28T10:05:00')
+    event, version, data = parse(next(streams[0]))
+    assert (event, version) == ('delta', 2)
+    assert data == {'components': {'Credit': 0.4}, 'meta': {'computed_at': '2024-06-28T10:05:00'}}
+
+
+def test_lagging_client_gets_full_snapshot_and_heartbeats():
+    broadcaster = SnapshotBroadcaster(heartbeat=0.05)
+    for i in range(3):
+        broadcaster.publish({'composite': i / 10}, f't{i}')
+    stream = broadcaster.stream(last_event_id='1')
+    next(stream)
+    event, version, data = parse(next(stream))
+    assert (event, version, data['composite']) == ('snapshot', 3, 0.2)
+    assert next(stream) == b": keep-alive\n\n"
+    stream.close()
+    assert broadcaster.subscribers == 0
+
+
+def test_engine_refresh_is_pushed(tmp_path):
+    engine = offline_engine(SlowFred(delay=0), tmp_path)
+    broadcaster = SnapshotBroadcaster(heartbeat=1)
+    engine.subscribe(broadcaster.publish)
+    stream = broadcaster.stream()
+    next(stream)
+    threading.Thread(target=engine.calculate_regime).start()
+    event, _, data = parse(next(stream))
+    assert event == 'snapshot'
+    assert data['meta']['computed_at'] == engine.snapshot_meta()['computed_at']
+    assert 'composite' in data
+
+
+def test_patches_skip_encoding_the_full_snapshot():
+    broadcaster = SnapshotBroadcaster(heartbeat=0.05)
+    stream = broadcaster.stream()
+    next(stream)
+    broadcaster.publish({'composite': 0.1, 'raw': {'market': {'tlt_vol': 15.0, 'momentum_history': [1, 2]}}}, 't0')
+    next(stream)
+    broadcaster.publish_patch({'composite': 0.2, 'raw': {'market': {'tlt_vol': 16.0}}}, 't1')
+    assert broadcaster._full is None
+    event, version, data = parse(next(stream))
+    assert (event, version) == ('delta', 2)
+    assert data['raw'] == {'market': {'tlt_vol': 16.0}}
+
+    # A client that joins later gets the patched snapshot in full
+    late = broadcaster.stream()
+    next(late)
+    event, _, data = parse(next(late))
+    assert event == 'snapshot' and data['composite'] == 0.2
+    assert data['raw']['market'] == {'tlt_vol': 16.0, 'momentum_history': [1, 2]}
+
+
+def test_tick_during_a_refresh_gets_its_own_version(monkeypatch):
+    broadcaster = SnapshotBroadcaster(heartbeat=0.05)
+    broadcaster.publish({'composite': 0.1, 'raw': {'market': {'tlt_vol': 15.0}}}, 't0')
+    tick = threading.Thread(target=broadcaster.publish_patch,
+                            args=({'raw': {'market': {'tlt_vol': 16.0}}}, 't2'))
+    encode = stream_module._event
+
+    def interleaved(name, version, data):
+        # The quote tick arrives while the refresh is still encoding its events
+        if name == 'snapshot' and tick.ident is None:
+            tick.start()
+            tick.join(timeout=0.2)
+        return encode(name, version, data)
+
+    monkeypatch.setattr(stream_module, '_event', interleaved)
+    broadcaster.publish({'composite': 0.2, 'raw': {'market': {'tlt_vol': 15.0}}}, 't1')
+    tick.join()
+    # The refresh is version 2 and the tick, patching the refreshed snapshot, version 3
+    stream = broadcaster.stream(last_event_id='2')
+    next(stream)
+    event, version, data = parse(next(stream))
+    assert (event, version, data['raw']) == ('delta', 3, {'market': {'tlt_vol': 16.0}})
+    stream = broadcaster.stream(last_event_id='1')
+    next(stream)
+    event, version, data = parse(next(stream))
+    assert (event, version) == ('snapshot', 3)
+    assert data['composite'] == 0.2 and data['raw']['market']['tlt_vol'] == 16.0
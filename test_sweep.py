@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from fakes import synthetic_market
+from data_engine import COMPONENTS, DEFAULT_PARAMS, RegimeParams, composite_history
+from sweep import param_grid, run_sweep, sweep_inputs
+
+
+def history_panel():
+    closes = synthetic_market(['SPY', 'GLD', 'HG=F', 'DX-Y.NYB', 'TLT', 'XLK', 'XLP'], days=600)
+    nfci = pd.Series(np.sin(np.arange(130) / 6), index=pd.date_range('2022-01-07', periods=130, freq='W-FRI'))
+    return {'NFCI': nfci}, closes
+
+
+def test_param_grid_renormalizes_weights():
+    configs = param_grid(weights={'Credit': [0.2, 0.45]}, divisors={'Growth': [0.1, 0.15, 0.2]})
+    assert len(configs) == 6
+    assert all(np.isclose(sum(c.weights), 1.0) for c in configs)
+    assert configs[0].divisors == (2e12, 2.5, 0.8, 0.1, 0.15, 0.5)
+    assert np.isclose(configs[-1].weights[1], 0.45 / 1.25)
+
+
+def test_sweep_matches_history_composite():
+    fred, closes = history_panel()
+    signed, forward = sweep_inputs(fred, closes, horizon=21)
+    params = RegimeParams(divisors=(2e12, 2.5, 0.8, 0.05, 0.05, 0.5))
+    stats = run_sweep(signed, forward, [DEFAULT_PARAMS, params], processes=2)
+    assert len(stats) == 2
+    assert list(stats.columns[:6]) == [f'w_{c}' for c in COMPONENTS]
+
+    composite = composite_history(fred, closes, params=params)['composite']
+    fwd = closes['SPY'].shift(-21) / closes['SPY'] - 1
+    called = composite[composite.abs() > 0.1]
+    expected = (np.sign(called) == np.sign(fwd.reindex(called.index))).loc[fwd.reindex(called.index).notna()].mean()
+    assert np.isclose(stats.loc[1, 'hit_rate'], expected)
+    assert 0 <= stats.loc[1, 'coverage'] <= 1
@@ -0,0 +1,72 @@
+import itertools
+import time
+import numpy as np
+from fakes import FakeDownload, SlowFred, synthetic_market
+from data_engine import CORE_ASSETS, MacroEngine
+from series_store import SeriesStore
+
+
+def universe_engine(tmp_path, extra):
+    assets = list(CORE_ASSETS) + [t for t in extra if t not in CORE_ASSETS]
+    engine = MacroEngine(store=SeriesStore(str(tmp_path)), universe=extra, fred=SlowFred(delay=0),
+                         download=FakeDownload(synthetic_market(assets)))
+    engine.news = None
+    return engine
+
+
+def test_universe_keeps_core_assets(tmp_path, monkeypatch):
+    monkeypatch.setenv('MACRO_UNIVERSE', 'EWJ, EWG,SPY')
+    engine = MacroEngine(store=SeriesStore(str(tmp_path)))
+    assert list(engine.assets) == list(CORE_ASSETS) + ['EWJ', 'EWG']
+    assert engine.assets['SPY'] == 'S&P 500'
+
+
+def test_large_universe_is_downloaded_in_chunks(tmp_path):
+    extra = [f'ETF{i:03d}' for i in range(493)]
+    engine = universe_engine(tmp_path, extra)
+    start = time.perf_counter()
+    data = engine.calculate_regime()
+    assert time.perf_counter() - start < 10
+    assert len(engine.download.calls) == 5
+    assert len(data['raw']['market']['momentum']) == 500
+    summary = data['summaries']['correlation']
+    assert len(summary['top_strongest']) == 5
+    assert summary['top_strongest'][0] == summary['strongest']
+
+
+def test_correlation_summary_matches_pairwise_scan(tmp_path):
+    engine = universe_engine(tmp_path, ['EWJ', 'EWG', 'EWZ'])
+    panel = engine.download.panel
+    corr = panel.corr()
+    summary = engine._get_correlation_summary(corr)
+    pairs = [(f'{a}/{b}', corr.at[a, b]) for a, b in itertools.combinations(corr.columns, 2)]
+    assert summary['strongest'] == {'pair': max(pairs, key=lambda p: p[1])[0], 'val': max(v for _, v in pairs)}
+    assert summary['weakest']['val'] == min(v for _, v in pairs)
+    assert np.isclose(summary['tension'], np.mean([abs(v) for _, v in pairs]) * 10)
+
+
+def test_momentum_leader_is_a_core_asset(tmp_path):
+    extra = [f'ETF{i:03d}' for i in range(100)]
+    engine = universe_engine(tmp_path, extra)
+    # Every extra ticker outruns the core assets
+    panel = engine.download.panel
+    panel[extra] = panel[extra].mul(np.linspace(1, 3, len(panel)), axis=0)
+    data = engine.calculate_regime()
+    summary = data['summaries']['momentum']
+    core = {t: v for t, v in data['raw']['market']['momentum'].items() if t in CORE_ASSETS}
+    assert summary['leader']['name'] == CORE_ASSETS[max(core, key=core.get)]
+    assert summary['laggard']['name'] == CORE_ASSETS[min(core, key=core.get)]
+    assert summary['breadth'] > 90
+
+
+def test_history_backfills_only_core_assets(tmp_path):
+    extra = [f'ETF{i:03d}' for i in range(150)]
+    engine = universe_engine(tmp_path, extra)
+    # The extra tickers listed after the backtest starts
+    panel = engine.download.panel
+    panel.iloc[:100, len(CORE_ASSETS):] = np.nan
+    engine.calculate_regime()
+    downloads = len(engine.download.calls)
+    fred, closes = engine.history_data(panel.index[60])
+    assert list(closes.columns) == list(CORE_ASSETS)
+    assert len(engine.download.calls) == downloads